@@ -0,0 +1,198 @@
+import heapq
+import time
+
+INF = float("inf")
+
+ARA_EPSILON_START = 3.0 # Heuristic inflation of the first (fast, suboptimal) search
+ARA_EPSILON_STEP = 0.5  # ... lowered by this after every published path, down to 1 (optimal)
+ARA_CLOCK_CHECK = 32    # Expansions between clock reads; also the minimum progress per frame
+
+
+class AnytimeAStarPlanner:
+    """
+    Anytime Repairing A* (ARA*, Likhachev, Gordon & Thrun 2003) under a per-frame budget.
+
+    plan() starts a new search with an inflated heuristic (epsilon), which
+    finds a path quickly, then every improve() lowers epsilon and repairs the
+    search (reusing g values, re-opening only inconsistent cells) until the
+    path is optimal. Work stops when the frame's budget is used up
+    (frame_budget seconds and/or frame_expansions, reset by begin_frame())
+    and resumes on the next call, so no frame ever waits for a full search.
+
+    plan() / improve() return the best path so far, None while the first
+    search has not finished yet. bound is the proven suboptimality of that
+    path (cost <= bound * optimal).
+
+    Same cost model as DStarLitePlanner: entering a cell costs cost_fn(x, y),
+    INF means blocked. The search starts over on every plan() call.
+    """
+
+    DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+    def __init__(self, width, height, goal, cost_fn, frame_budget=None, frame_expansions=None,
+                 epsilon_start=ARA_EPSILON_START, epsilon_step=ARA_EPSILON_STEP, clock=time.perf_counter):
+        self.width = width
+        self.height = height
+        self.goal = goal
+        self.cost_fn = cost_fn
+        self.frame_budget = frame_budget         # s of search per frame (None = unlimited)
+        self.frame_expansions = frame_expansions # Expansions per frame (None = unlimited)
+        self.epsilon_start = epsilon_start
+        self.epsilon_step = epsilon_step
+        self.clock = clock
+
+        self.start = None
+        self.epsilon = epsilon_start
+        self.g = {}
+        self.parent = {}
+        self.open = {}      # cell -> key, heap entries not matching it are stale
+        self.open_heap = [] # (key, h, cell)
+        self.closed = set()
+        self.incons = set() # Improved after being closed, re-opened at the next epsilon
+        self.path = None    # Best path so far
+        self.bound = INF    # Suboptimality bound of self.path
+        self.finished = True
+
+        self.frame_spent = 0.0
+        self.frame_expanded = 0
+
+        # Stats
+        self.expansions = 0
+        self.solutions = 0      # Paths published
+        self.bound_sum = 0.0    # Sum of their bounds (mean_bound)
+        self.time_used = 0.0    # s spent searching
+        self.interrupts = 0     # Searches cut short by the frame budget
+        self.last_frame_time = 0.0
+
+    def heuristic(self, a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def begin_frame(self):
+        """Starts a new frame: the whole budget is available again."""
+        self.last_frame_time = self.frame_spent
+        self.frame_spent = 0.0
+        self.frame_expanded = 0
+
+    def mean_bound(self):
+        return self.bound_sum / self.solutions if self.solutions else 1.0
+
+    def key(self, cell):
+        return self.g[cell] + self.epsilon * self.heuristic(cell, self.goal)
+
+    def push(self, cell):
+        key = self.key(cell)
+        self.open[cell] = key
+        heapq.heappush(self.open_heap, (key, self.heuristic(cell, self.goal), cell))
+
+    def plan(self, start, changed_cells=()):
+        """Starts over from start (changed_cells is implied: costs are re-read) and searches within the frame budget."""
+        self.start = start
+        self.epsilon = self.epsilon_start
+        self.g = {start: 0}
+        self.parent = {start: None}
+        self.open = {}
+        self.open_heap = []
+        self.closed = set()
+        self.incons = set()
+        self.path = None
+        self.bound = INF
+        self.finished = False
+        self.push(start)
+        return self.improve()
+
+    def improve(self):
+        """Continues the search within what is left of the frame budget; returns the best path so far."""
+        started = self.clock()
+        try:
+            while not self.finished:
+                if not self.improve_path(started):
+                    self.interrupts += 1
+                    break
+                self.publish()
+                if self.epsilon <= 1.0 or self.path == []:
+                    self.finished = True
+                    break
+
+                # Next, tighter iteration: re-open everything that became inconsistent
+                self.epsilon = max(1.0, self.epsilon - self.epsilon_step)
+                for cell in self.incons:
+                    self.open[cell] = None
+                self.incons = set()
+                cells = list(self.open)
+                self.open = {}
+                self.open_heap = []
+                for cell in cells:
+                    self.push(cell)
+                self.closed = set()
+        finally:
+            spent = self.clock() - started
+            self.frame_spent += spent
+            self.time_used += spent
+        return self.path
+
+    def out_of_budget(self, started):
+        if self.frame_expanded == 0 or self.frame_expanded % ARA_CLOCK_CHECK:
+            return False
+        if self.frame_expansions is not None and self.frame_expanded >= self.frame_expansions:
+            return True
+        return self.frame_budget is not None and self.frame_spent + self.clock() - started >= self.frame_budget
+
+    def improve_path(self, started):
+        """Expands until the goal's key is the lowest open one; False if the budget ran out first."""
+        goal = self.goal
+        cost_fn = self.cost_fn
+        while self.open_heap:
+            key, _, cell = self.open_heap[0]
+            if self.open.get(cell) != key:
+                heapq.heappop(self.open_heap) # Stale entry
+                continue
+            if goal in self.g and self.g[goal] <= key:
+                return True
+            if self.out_of_budget(started):
+                return False
+
+            heapq.heappop(self.open_heap)
+            del self.open[cell]
+            self.closed.add(cell)
+            self.expansions += 1
+            self.frame_expanded += 1
+
+            cx, cy = cell
+            for dx, dy in self.DIRECTIONS:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < self.width and 0 <= ny < self.height):
+                    continue
+                step = cost_fn(nx, ny)
+                if step == INF:
+                    continue
+                n = (nx, ny)
+                new_g = self.g[cell] + step
+                if new_g < self.g.get(n, INF):
+                    self.g[n] = new_g
+                    self.parent[n] = cell
+                    if n in self.closed:
+                        self.incons.add(n)
+                    else:
+                        self.push(n)
+        return True
+
+    def publish(self):
+        """Extracts the path of the finished iteration and its suboptimality bound."""
+        goal = self.goal
+        if goal not in self.g:
+            self.path = [] # Blocked
+            return
+
+        path = []
+        cell = goal
+        while cell is not None:
+            path.append(cell)
+            cell = self.parent[cell]
+        self.path = path[::-1]
+
+        # Optimal cost >= lowest g + h of any open / inconsistent cell
+        frontier = [self.g[c] + self.heuristic(c, goal) for c in list(self.open) + list(self.incons)]
+        lower = min(frontier) if frontier else self.g[goal]
+        self.bound = max(1.0, min(self.epsilon, self.g[goal] / lower)) if lower > 0 else 1.0
+        self.solutions += 1
+        self.bound_sum += self.bound
@@ -0,0 +1,222 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from decision_store import DecisionStore
+from fake_analyzer import FakeAnalyzer
+from simulation import RobotSimulation, MAP_WIDTH, MAP_HEIGHT, SENSOR_RANGE, LLM_HEDGE_MODE, LOCAL_SCORER_ENABLED, \
+    PLANNER_FRAME_BUDGET, PLANNER_FRAME_EXPANSIONS, FLEET_SIZE
+
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Each scenario runs one seeded mission per seed against the stand-in analyzer.
+SCENARIOS = [
+    {"name": "dstar_default", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5]},
+    {"name": "astar_default", "planner_mode": "astar", "seeds": [1, 2, 3, 4, 5]},
+    {"name": "hpa_default", "planner_mode": "hpa", "seeds": [1, 2, 3, 4, 5]},
+    # ARA* with a fixed expansion budget per tick instead of a wall-clock one (deterministic)
+    {
+        "name": "anytime_default",
+        "planner_mode": "anytime",
+        "seeds": [1, 2, 3, 4, 5],
+        "planner_budget": None,
+        "planner_expansions": 400,
+    },
+    # 3x the default map on each side: where the hierarchical planner is meant to pay off
+    {"name": "dstar_large_map", "planner_mode": "dstar_lite", "seeds": [1, 2, 3], "width": 240, "height": 180},
+    {"name": "hpa_large_map", "planner_mode": "hpa", "seeds": [1, 2, 3], "width": 240, "height": 180},
+    # Robots sharing the map, decision cache and LLM queue (totals are over the fleet)
+    {"name": "dstar_fleet_2", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "fleet_size": 2},
+    {"name": "dstar_fleet_4", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "fleet_size": 4},
+    {
+        "name": "dstar_slow_llm",
+        "planner_mode": "dstar_lite",
+        "seeds": [1, 2, 3, 4, 5],
+        "latency": {
+            "ministral-3:3b": ("lognormal", 4.0, 0.6),
+            "qwen2.5:1.5b": ("lognormal", 5.0, 0.6),
+            "deepseek-r1:1.5b": ("lognormal", 12.0, 0.6),
+        },
+    },
+    {
+        "name": "dstar_fast_llm",
+        "planner_mode": "dstar_lite",
+        "seeds": [1, 2, 3, 4, 5],
+        "latency": {
+            "ministral-3:3b": ("fixed", 0.3, 0),
+            "qwen2.5:1.5b": ("fixed", 0.3, 0),
+            "deepseek-r1:1.5b": ("fixed", 1.0, 0),
+        },
+    },
+    # Cluster A's usually-fastest model is degraded (e.g. swapped out): routing has to move to qwen
+    {
+        "name": "dstar_degraded_model",
+        "planner_mode": "dstar_lite",
+        "seeds": [1, 2, 3, 4, 5],
+        "latency": {"ministral-3:3b": ("lognormal", 15.0, 0.4)},
+    },
+    # Close-range requests go to both Cluster A models, the first verdict wins
+    {"name": "dstar_hedge_both", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "hedge_mode": "both"},
+    {"name": "dstar_no_hedge", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "hedge_mode": None},
+    # Stand-in models stream and stop after the score, like OllamaAnalyzer with STREAM_RESPONSES
+    {"name": "dstar_streaming", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "stream": True},
+    {"name": "dstar_long_sensor", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "sensor_range": 10},
+    # Every unknown goes to the LLM as a temporary wall (no local fast path)
+    {"name": "dstar_no_local", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "local_scorer": False},
+    # Seeds run in order against one on-disk decision store (warm runs after the first)
+    {"name": "dstar_warm_store", "planner_mode": "dstar_lite", "seeds": [1, 2, 3, 4, 5], "shared_store": True},
+]
+
+# Metrics compared against the baseline: name -> True if higher is better.
+# Wall-clock metrics are machine dependent and only reported.
+CHECKED_METRICS = {
+    "reached_goal": True,
+    "time_to_goal": False,
+    "replans": False,
+    "expansions": False,
+    "llm_calls": False,
+    "cache_hits": True,
+}
+REPORTED_METRICS = list(CHECKED_METRICS) + ["replans_skipped", "plan_bound", "local_hits", "provisional", "llm_dedup", "steps", "steps_per_sim_s", "wall_time", "steps_per_wall_s"]
+
+
+def run_mission(scenario, seed, max_sim_time, decision_store=None):
+    analyzer = FakeAnalyzer(latency=scenario.get("latency"), seed=seed, stream=scenario.get("stream", False))
+
+    # The simulation is chatty on stdout; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = RobotSimulation(
+            analyzer=analyzer,
+            width=scenario.get("width", MAP_WIDTH),
+            height=scenario.get("height", MAP_HEIGHT),
+            warmup=False,
+            seed=seed,
+            planner_mode=scenario.get("planner_mode", "dstar_lite"),
+            decision_store=decision_store,
+            sensor_range=scenario.get("sensor_range", SENSOR_RANGE),
+            hedge_mode=scenario.get("hedge_mode", LLM_HEDGE_MODE),
+            local_scorer=scenario.get("local_scorer", LOCAL_SCORER_ENABLED),
+            planner_budget=scenario.get("planner_budget", PLANNER_FRAME_BUDGET),
+            planner_expansions=scenario.get("planner_expansions", PLANNER_FRAME_EXPANSIONS),
+            fleet_size=scenario.get("fleet_size", FLEET_SIZE),
+        )
+
+        wall_start = time.perf_counter()
+        summary = sim.run_headless(max_sim_time=max_sim_time)
+        wall_time = time.perf_counter() - wall_start
+
+    return {
+        "reached_goal": 1.0 if summary["reached_goal"] else 0.0,
+        "time_to_goal": summary["total_time"],
+        "steps": summary["steps"],
+        "steps_per_sim_s": summary["avg_speed"],
+        "replans": summary["replans"],
+        "replans_skipped": summary["replans_skipped"],
+        "expansions": summary["expansions"],
+        "plan_bound": summary["plan_bound"],
+        "llm_calls": summary["llm_calls"],
+        "cache_hits": summary["cache_hits"],
+        "local_hits": summary["local_hits"],
+        "provisional": summary["provisional"],
+        "llm_dedup": summary["llm_dedup"],
+        "obstacles_found": summary["obstacles_found"],
+        "wall_time": wall_time,
+        "steps_per_wall_s": summary["steps"] / wall_time if wall_time > 0 else 0,
+    }
+
+
+def run_scenario(scenario, max_sim_time):
+    store = None
+    if scenario.get("shared_store"):
+        fd, store_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        store = DecisionStore(store_path)
+
+    try:
+        runs = [run_mission(scenario, seed, max_sim_time, store) for seed in scenario["seeds"]]
+    finally:
+        if store is not None:
+            store.close()
+            os.remove(store_path)
+    return {k: sum(r[k] for r in runs) / len(runs) for k in REPORTED_METRICS}
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regression messages (empty if everything is within tolerance)."""
+    regressions = []
+    for name, metrics in results.items():
+        if name not in baseline:
+            continue
+        for metric, higher_is_better in CHECKED_METRICS.items():
+            base = baseline[name].get(metric)
+            if base is None:
+                continue
+            current = metrics[metric]
+            slack = abs(base) * tolerance + 1e-9
+            if higher_is_better and current < base - slack:
+                regressions.append(f"{name}.{metric}: {current:.2f} < baseline {base:.2f}")
+            elif not higher_is_better and current > base + slack:
+                regressions.append(f"{name}.{metric}: {current:.2f} > baseline {base:.2f}")
+    return regressions
+
+
+def print_table(results):
+    width = max([18] + [len(name) + 2 for name in results])
+    header = f"{'scenario':<{width}}" + "".join(f"{m:>17}" for m in REPORTED_METRICS)
+    print(header)
+    print("-" * len(header))
+    for name, metrics in results.items():
+        print(f"{name:<{width}}" + "".join(f"{metrics[m]:>17.2f}" for m in REPORTED_METRICS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seeded mission benchmark with a stand-in LLM backend.")
+    parser.add_argument("--scenario", action="append", help="Only run the named scenario(s)")
+    parser.add_argument("--max-sim-time", type=float, default=600.0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero if a metric regressed vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative slack for --check")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s["name"] in args.scenario]
+    results = {s["name"]: run_scenario(s, args.max_sim_time) for s in scenarios}
+
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[BENCH] Baseline saved to {args.baseline}")
+
+    if args.check:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"[BENCH] No baseline at {args.baseline}")
+            return 1
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("[BENCH] REGRESSIONS:")
+            for line in regressions:
+                print(f"   -> {line}")
+            return 1
+        print("[BENCH] No regressions vs baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
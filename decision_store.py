@@ -0,0 +1,161 @@
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+
+DECISION_STORE_PATH = "decision_cache.db"
+DEFAULT_TTL = 7 * 24 * 3600   # s, verdicts older than this are ignored and evicted
+DEFAULT_MAX_ENTRIES = 10000
+WRITE_INTERVAL = 1.0          # s between background writes of new verdicts
+EVICT_EVERY = 500             # Written rows between eviction passes (also run at open time)
+
+
+def obstacle_hash(props):
+    """Stable hash of the obstacle description (type/visual/physics, whitespace and case normalized)."""
+    normalized = {k: " ".join(str(props.get(k, "")).lower().split()) for k in ("type", "visual", "physics")}
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class DecisionStore:
+    """
+    Persistent verdict cache shared across missions (SQLite).
+
+    Rows are keyed by (obstacle hash, model, prompt version) so changing the
+    system prompt invalidates old verdicts. lookup() returns the freshest
+    verdict for the obstacle from any model. The table is read into memory
+    on first use and put() only updates that copy and queues the row; a
+    background thread writes queued rows in one transaction every
+    write_interval seconds and evicts old rows every evict_every writes,
+    so the game loop never waits on a query. close() writes what is left.
+    """
+
+    def __init__(self, path=DECISION_STORE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 write_interval=WRITE_INTERVAL, evict_every=EVICT_EVERY):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.write_interval = write_interval
+        self.evict_every = evict_every
+        self.lock = threading.Lock()    # entries
+        self.db_lock = threading.Lock() # conn (loader / writer thread)
+
+        self.conn = None
+        self.entries = None # (obstacle_hash, prompt_version) -> (score, model, created_at)
+        self.queued = deque() # Rows waiting for the writer thread
+        self.wakeup = threading.Event()
+        self.writer = None
+        self.closed = False
+        self.since_evict = 0
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        """Opens the database and reads valid verdicts into memory (first call only)."""
+        if self.entries is not None:
+            return
+        self.entries = {}
+        try:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                " obstacle_hash TEXT NOT NULL,"
+                " model TEXT NOT NULL,"
+                " prompt_version TEXT NOT NULL,"
+                " obstacle_type TEXT,"
+                " score INTEGER NOT NULL,"
+                " label TEXT,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (obstacle_hash, model, prompt_version))"
+            )
+            self.evict()
+            self.conn.commit()
+
+            rows = self.conn.execute(
+                "SELECT obstacle_hash, prompt_version, score, model, created_at FROM verdicts ORDER BY created_at"
+            )
+            for h, version, score, model, created_at in rows:
+                self.entries[(h, version)] = (score, model, created_at) # Newest wins
+            print(f"[DECISION STORE] Loaded {len(self.entries)} verdicts from {self.path}")
+        except sqlite3.Error as e:
+            print(f"[DECISION STORE] Disabled, could not open {self.path}: {e}")
+            self.conn = None
+            return
+        self.writer = threading.Thread(target=self.run, name="decision-store", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def lookup(self, props, prompt_version):
+        """Returns the stored score for this obstacle (or None)."""
+        with self.lock:
+            self._load()
+            entry = self.entries.get((obstacle_hash(props), prompt_version))
+            if entry is None or entry[2] < time.time() - self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, props, score, model, prompt_version, label=None):
+        """Records the verdict in memory and queues it for the writer thread (never touches the disk)."""
+        with self.lock:
+            self._load()
+            h = obstacle_hash(props)
+            now = time.time()
+            self.entries[(h, prompt_version)] = (score, model, now)
+            if self.conn is None or self.closed:
+                return
+            self.queued.append((h, model, prompt_version, props.get("type"), score, label, now))
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.write_interval)
+            self.wakeup.clear()
+            self.write_queued()
+        self.write_queued()
+
+    def write_queued(self):
+        """Writes the queued rows in one transaction, evicting every evict_every rows."""
+        if not self.queued:
+            return
+        rows = []
+        while self.queued:
+            rows.append(self.queued.popleft())
+        with self.db_lock:
+            if self.conn is None:
+                return
+            try:
+                self.conn.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self.since_evict += len(rows)
+                if self.since_evict >= self.evict_every:
+                    self.evict()
+                    self.since_evict = 0
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"[DECISION STORE] Write failed: {e}")
+
+    def evict(self):
+        """Drops expired rows and the oldest rows beyond max_entries (caller owns the connection)."""
+        self.conn.execute("DELETE FROM verdicts WHERE created_at < ?", (time.time() - self.ttl,))
+        self.conn.execute(
+            "DELETE FROM verdicts WHERE rowid IN ("
+            " SELECT rowid FROM verdicts ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self):
+        """Writes the queued verdicts, stops the writer thread and closes the database."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer is not None:
+            self.wakeup.set()
+            self.writer.join()
+        with self.db_lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
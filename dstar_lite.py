@@ -0,0 +1,147 @@
+import heapq
+
+INF = float("inf")
+
+
+class DStarLitePlanner:
+    """
+    Incremental planner (D* Lite, Koenig & Likhachev 2002).
+
+    Searches backwards from the goal and keeps its g/rhs values between calls,
+    so after a map change only the vertices whose cost-to-goal actually changed
+    are repaired. Uses the same cost model as find_path_astar: entering a cell
+    costs cost_fn(x, y), INF means the cell is blocked.
+    """
+
+    DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+    def __init__(self, width, height, goal, cost_fn):
+        self.width = width
+        self.height = height
+        self.goal = goal
+        self.cost_fn = cost_fn
+
+        self.g = {}
+        self.rhs = {goal: 0}
+        self.open_heap = []   # (k1, k2, cell) - may contain stale entries
+        self.open_keys = {}   # cell -> current key (lazy deletion)
+        self.km = 0
+        self.start = None
+        self.last_start = None
+
+        # Stats
+        self.expansions = 0  # Total vertex expansions since creation
+
+    def heuristic(self, a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def neighbors(self, cell):
+        x, y = cell
+        for dx, dy in self.DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                yield (nx, ny)
+
+    def calculate_key(self, cell):
+        m = min(self.g.get(cell, INF), self.rhs.get(cell, INF))
+        return (m + self.heuristic(self.start, cell) + self.km, m)
+
+    def push(self, cell):
+        key = self.calculate_key(cell)
+        self.open_keys[cell] = key
+        heapq.heappush(self.open_heap, (key[0], key[1], cell))
+
+    def update_vertex(self, cell):
+        if cell != self.goal:
+            best = INF
+            for n in self.neighbors(cell):
+                cost = self.cost_fn(n[0], n[1])
+                if cost == INF:
+                    continue
+                value = cost + self.g.get(n, INF)
+                if value < best:
+                    best = value
+            self.rhs[cell] = best
+
+        self.open_keys.pop(cell, None)
+        if self.g.get(cell, INF) != self.rhs.get(cell, INF):
+            self.push(cell)
+
+    def compute_shortest_path(self):
+        while self.open_heap:
+            k1, k2, cell = self.open_heap[0]
+            if self.open_keys.get(cell) != (k1, k2):
+                heapq.heappop(self.open_heap) # Stale entry
+                continue
+
+            start_g = self.g.get(self.start, INF)
+            start_rhs = self.rhs.get(self.start, INF)
+            if (k1, k2) >= self.calculate_key(self.start) and start_g == start_rhs:
+                break
+
+            heapq.heappop(self.open_heap)
+            del self.open_keys[cell]
+            self.expansions += 1
+
+            new_key = self.calculate_key(cell)
+            if (k1, k2) < new_key:
+                # Key is outdated because km grew since it was queued
+                self.open_keys[cell] = new_key
+                heapq.heappush(self.open_heap, (new_key[0], new_key[1], cell))
+            elif self.g.get(cell, INF) > self.rhs.get(cell, INF):
+                # Overconsistent: settle it and propagate to predecessors
+                self.g[cell] = self.rhs[cell]
+                for n in self.neighbors(cell):
+                    self.update_vertex(n)
+            else:
+                # Underconsistent: cost went up, re-derive cell and predecessors
+                self.g[cell] = INF
+                self.update_vertex(cell)
+                for n in self.neighbors(cell):
+                    self.update_vertex(n)
+
+    def plan(self, start, changed_cells=()):
+        """
+        Returns the path [start, ..., goal] (empty list if blocked).
+        changed_cells: cells whose cost changed since the previous call.
+        """
+        if self.start is None:
+            self.start = start
+            self.last_start = start
+            self.push(self.goal)
+        elif start != self.start:
+            self.start = start
+            self.km += self.heuristic(self.last_start, start)
+            self.last_start = start
+
+        # Entering cell c got cheaper/more expensive -> only its neighbours' rhs change
+        for cell in changed_cells:
+            for n in self.neighbors(cell):
+                self.update_vertex(n)
+
+        self.compute_shortest_path()
+        return self.extract_path()
+
+    def extract_path(self):
+        if self.g.get(self.start, INF) == INF:
+            return []
+
+        path = [self.start]
+        current = self.start
+        max_len = self.width * self.height
+        while current != self.goal:
+            best, best_cell = INF, None
+            for n in self.neighbors(current):
+                cost = self.cost_fn(n[0], n[1])
+                if cost == INF:
+                    continue
+                value = cost + self.g.get(n, INF)
+                if value < best:
+                    best, best_cell = value, n
+
+            if best_cell is None or len(path) > max_len:
+                return []
+            current = best_cell
+            path.append(current)
+
+        return path
@@ -0,0 +1,174 @@
+import random
+import threading
+
+from latency import LatencyTracker
+
+# Ground truth verdicts for the mystery templates (what a good model should answer)
+MYSTERY_SCORES = {
+    "mystery_box": 50,
+    "alien_monolith": 100,
+    "glitch_trap": 85,
+    "magnetic_field": 60,
+    "robot_scrap": 75,
+    "oil_slick": 70,
+    "toxic_gas": 95,
+    "lava_crust": 100,
+    "wet_gravel": 20,
+    "cracked_asphalt": 10,
+}
+
+# Default latency profile per model: (distribution, a, b) in seconds
+#   fixed       -> a
+#   uniform     -> U(a, b)
+#   lognormal   -> median a, sigma b
+#   exponential -> mean a
+DEFAULT_LATENCY = {
+    "ministral-3:3b": ("lognormal", 1.5, 0.4),
+    "qwen2.5:1.5b": ("lognormal", 2.0, 0.4),
+    "deepseek-r1:1.5b": ("lognormal", 6.0, 0.5),
+}
+
+# Extra latency per additional obstacle in a batched request (fraction of one request)
+BATCH_ITEM_COST = 0.25
+
+# Streaming: share of the generation time until the score token of a single verdict
+# (OllamaAnalyzer stops reading there; batches still need every verdict)
+EARLY_VERDICT_FRACTION = 0.3
+
+
+class FakeAnalyzer:
+    """
+    Stand-in for OllamaAnalyzer used by benchmarks and headless runs.
+
+    Same public surface (models, queue_depths, latency, is_available,
+    analyze_obstacle, analyze_batch, get_latency_stats) but no network: latency is
+    sampled from a seeded distribution and charged on the simulation clock.
+    Concurrency is left to LLMDispatcher's per-model slots, so a request
+    starts generating as soon as it is sent; a cancelled (or preempted)
+    request gives its queue slot back right away.
+    """
+
+    simulated = True
+    prompt_version = "stand-in"
+
+    def __init__(self, latency=None, seed=0, score_noise=0, failure_rate=0.0, stream=False):
+        self.models = list(DEFAULT_LATENCY.keys())
+        self.cluster_a = self.models[:2]
+        self.cluster_b = ["deepseek-r1:1.5b"]
+        self.latency_profile = dict(DEFAULT_LATENCY)
+        if latency:
+            self.latency_profile.update(latency)
+        self.rng = random.Random(seed)
+        self.score_noise = score_noise
+        self.failure_rate = failure_rate
+        self.stream = stream
+
+        # Set by RobotSimulation to its simulated clock
+        self.clock = lambda: 0.0
+
+        # Load Balance State (mirrors OllamaAnalyzer)
+        self.queue_depths = {m: 0 for m in self.models}
+        self.latency = {m: LatencyTracker(clock=lambda: self.clock(), initial=1.0) for m in self.models}
+        self.conn_stats = {m: {"requests": 0, "errors": 0, "timeouts": 0, "retries": 0, "connections": 0}
+                           for m in self.models}
+        self.lock = threading.Lock()
+
+        self.pending = [] # (ready_at, model, cancel_event, duration) of requests not finished yet
+
+    def sample_latency(self, model_id):
+        dist, a, b = self.latency_profile[model_id]
+        if dist == "fixed":
+            return a
+        if dist == "uniform":
+            return self.rng.uniform(a, b)
+        if dist == "lognormal":
+            return self.rng.lognormvariate(0.0, b) * a
+        if dist == "exponential":
+            return self.rng.expovariate(1.0 / a)
+        raise ValueError(f"Unknown latency distribution: {dist}")
+
+    def refresh(self):
+        """Releases queue slots of requests that finished (simulated clock) or were cancelled."""
+        now = self.clock()
+        still_pending = []
+        for entry in self.pending:
+            ready_at, model_id, cancel_event, duration = entry
+            if cancel_event is not None and cancel_event.is_set():
+                self.queue_depths[model_id] -= 1
+                if duration is not None:
+                    self.latency[model_id].record_cancel()
+            elif ready_at <= now:
+                self.queue_depths[model_id] -= 1
+                if duration is not None:
+                    self.latency[model_id].record(duration)
+            else:
+                still_pending.append(entry)
+        self.pending = still_pending
+
+    def is_available(self, model_id):
+        with self.lock:
+            self.refresh()
+            return self.latency[model_id].available()
+
+    def get_latency_stats(self):
+        with self.lock:
+            self.refresh()
+            return {m: tracker.snapshot() for m, tracker in self.latency.items()}
+
+    def select_best_model(self):
+        with self.lock:
+            self.refresh()
+            candidates = [m for m in self.cluster_a if self.latency[m].available()] or self.cluster_a
+            free_models = [m for m in candidates if self.queue_depths[m] == 0]
+            if free_models:
+                return min(free_models, key=lambda m: self.latency[m].ewma)
+            return min(candidates, key=lambda m: (self.queue_depths[m], self.latency[m].ewma))
+
+    def analyze_obstacle(self, obstacle_props, context_examples=None, forced_model=None, cancel_event=None,
+                         record_latency=True):
+        # A cancelled verdict is never released by LLMDispatcher; here it only frees the queue slot
+        return self.analyze_batch([obstacle_props], context_examples, forced_model, cancel_event,
+                                  record_latency)[0]
+
+    def analyze_batch(self, props_list, context_examples=None, forced_model=None, cancel_event=None,
+                      record_latency=True):
+        """One simulated round trip for all of props_list; longer output makes it a bit slower."""
+        model_id = forced_model or self.select_best_model()
+        now = self.clock()
+
+        with self.lock:
+            self.refresh()
+            tracker = self.latency[model_id] if record_latency else LatencyTracker()
+            tracker.on_start()
+            service_time = self.sample_latency(model_id) * (1 + BATCH_ITEM_COST * (len(props_list) - 1))
+            if self.stream and len(props_list) == 1:
+                service_time *= EARLY_VERDICT_FRACTION # Generation is aborted after the score
+            ready_at = now + service_time
+            self.queue_depths[model_id] += 1
+            self.conn_stats[model_id]["requests"] += 1
+            duration = ready_at - now
+
+            if self.rng.random() < self.failure_rate:
+                self.queue_depths[model_id] -= 1
+                self.conn_stats[model_id]["errors"] += 1
+                tracker.record_failure()
+                return [None] * len(props_list)
+
+            self.pending.append((ready_at, model_id, cancel_event, duration if record_latency else None))
+
+            results = []
+            for props in props_list:
+                score = MYSTERY_SCORES.get(props.get("type"), 50)
+                if self.score_noise:
+                    score = int(max(0, min(100, score + self.rng.gauss(0, self.score_noise))))
+                results.append({
+                    "score": score,
+                    "rationale": "Stand-in verdict",
+                    "label": props.get("type", "Unknown"),
+                    "_meta_model": model_id,
+                    "_meta_duration": duration,
+                    "_meta_ready_at": ready_at,
+                    "_meta_batch_size": len(props_list),
+                })
+
+        return results
@@ -0,0 +1,91 @@
+import numpy as np
+
+INF = float("inf")
+
+# Map kodları:
+# real:  0 boş, 1 sabit duvar, 2 gizli engel (ground truth)
+# known: 0 bilinmiyor/boş sanıyor, 1 bilinen engel (duvar veya keşfedilen)
+EMPTY = 0
+WALL = 1
+HIDDEN = 2
+
+
+def score_to_cost(score):
+    """Semantic score (0-100) -> cost of entering the cell. Score > 80 is a wall."""
+    if score > 80:
+        return INF
+    # Ağırlıklı Maliyet: 1 + (Score / 10)
+    # Örn: Mud (60) -> 7, Puddle (40) -> 5
+    return 1 + (score / 10)
+
+
+# Cost per integer score (scores are sanitized to ints 0-100)
+SCORE_COSTS = np.array([score_to_cost(s) for s in range(101)], dtype=np.float32)
+
+
+def manhattan_distance_transform(mask):
+    """
+    Manhattan distance from every cell to the nearest True cell of mask (walls ignored).
+    Exact for L1: one forward/backward sweep per axis, each step vectorized over the other axis.
+    Cells are width + height (farther than any real distance) if mask is empty.
+    """
+    width, height = mask.shape
+    dist = np.where(mask, 0, width + height).astype(np.int32)
+    for x in range(1, width):
+        np.minimum(dist[x], dist[x - 1] + 1, out=dist[x])
+    for x in range(width - 2, -1, -1):
+        np.minimum(dist[x], dist[x + 1] + 1, out=dist[x])
+    for y in range(1, height):
+        np.minimum(dist[:, y], dist[:, y - 1] + 1, out=dist[:, y])
+    for y in range(height - 2, -1, -1):
+        np.minimum(dist[:, y], dist[:, y + 1] + 1, out=dist[:, y])
+    return dist
+
+
+class GridMap:
+    """
+    Contiguous NumPy storage for one map, indexed as layer[x, y].
+
+    real / known are uint8 occupancy layers, cost is the float32 layer the
+    planners read (INF = blocked). The cost layer is a cache of known + the
+    semantic score, so every write to known or to a score must go through
+    refresh_cost (or set_wall) to keep it in sync. Writes to real go through
+    set_real / set_wall, which bump real_version (sensor caches key on it).
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.real = np.zeros((width, height), dtype=np.uint8)
+        self.known = np.zeros((width, height), dtype=np.uint8)
+        self.cost = np.ones((width, height), dtype=np.float32)
+        self.real_version = 0
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def set_wall(self, x, y):
+        """Fixed wall: present in the real world and known from the start."""
+        self.set_real(x, y, WALL)
+        self.known[x, y] = WALL
+        self.cost[x, y] = INF
+
+    def set_real(self, x, y, value):
+        """Changes the ground truth at (x, y) (what the sensors see)."""
+        if self.real[x, y] != value:
+            self.real[x, y] = value
+            self.real_version += 1
+
+    def refresh_cost(self, x, y, score=None):
+        """Recomputes cost[x, y] from known[x, y] and the cell's score (None = no semantic info)."""
+        if self.known[x, y] == WALL:
+            self.cost[x, y] = INF
+        elif score is not None:
+            self.cost[x, y] = SCORE_COSTS[max(0, min(100, int(score)))]
+        else:
+            self.cost[x, y] = 1
+
+    def known_obstacle_cells(self):
+        """(x, y) pairs of every cell marked as an obstacle in known."""
+        xs, ys = np.nonzero(self.known == WALL)
+        return zip(xs.tolist(), ys.tolist())
@@ -0,0 +1,320 @@
+import heapq
+
+INF = float("inf")
+
+HPA_CLUSTER_SIZE = 10 # Cells per cluster side
+ENTRANCE_SPLIT = 6    # Entrances at least this wide get a transition at both ends instead of one in the middle
+
+
+class HPAStarPlanner:
+    """
+    Hierarchical A* (HPA*, Botea, Müller & Schaeffer 2004).
+
+    The grid is split into cluster_size x cluster_size clusters. Every run of
+    passable cell pairs along a cluster border is an entrance with one or two
+    transitions (a facing cell pair). The abstract graph has a node per
+    transition cell, inter edges across borders (one step) and intra edges
+    between the nodes of a cluster (shortest path inside the cluster).
+
+    plan() links start and goal into the abstract graph, searches it and
+    refines each abstract edge with an A* confined to one cluster. Changed
+    cells only rebuild their own cluster's borders and the intra edges of the
+    clusters whose cells or transitions changed.
+
+    Same interface and cost model as DStarLitePlanner: entering a cell costs
+    cost_fn(x, y), INF means blocked. Paths are near-optimal, not optimal.
+    """
+
+    def __init__(self, width, height, goal, cost_fn, cluster_size=HPA_CLUSTER_SIZE):
+        self.width = width
+        self.height = height
+        self.goal = goal
+        self.cost_fn = cost_fn
+        self.cluster_size = cluster_size
+        self.clusters_x = (width + cluster_size - 1) // cluster_size
+        self.clusters_y = (height + cluster_size - 1) // cluster_size
+
+        self.transitions = {}   # (cluster_a, cluster_b) -> [(cell_a, cell_b)], b right of / below a
+        self.inter = {}         # cell -> {cell across a border: cost}
+        self.cluster_nodes = {} # cluster -> set of transition cells inside it
+        self.intra = {}         # cluster -> {node: {node: cost}}
+        self.built = False
+
+        # Stats
+        self.expansions = 0        # Cell expansions (preprocessing, linking, refinement) + abstract node expansions
+        self.cluster_rebuilds = 0
+
+    def heuristic(self, a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def cluster_of(self, cell):
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+    def bounds(self, cluster):
+        cs = self.cluster_size
+        cx, cy = cluster
+        return cx * cs, cy * cs, min((cx + 1) * cs, self.width), min((cy + 1) * cs, self.height)
+
+    def passable(self, cell):
+        return self.cost_fn(cell[0], cell[1]) != INF
+
+    # --- Abstract graph ---
+
+    def borders_of(self, cluster):
+        """Keys of the (up to 4) borders of cluster, as used in self.transitions."""
+        cx, cy = cluster
+        keys = []
+        if cx + 1 < self.clusters_x:
+            keys.append((cluster, (cx + 1, cy)))
+        if cy + 1 < self.clusters_y:
+            keys.append((cluster, (cx, cy + 1)))
+        if cx > 0:
+            keys.append(((cx - 1, cy), cluster))
+        if cy > 0:
+            keys.append(((cx, cy - 1), cluster))
+        return keys
+
+    def border_pairs(self, a, b):
+        """Facing cell pairs along the border of a and b (b is right of or below a)."""
+        x0, y0, x1, y1 = self.bounds(a)
+        if b[0] == a[0] + 1:
+            return [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+        return [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+
+    def find_transitions(self, a, b):
+        transitions = []
+        run = []
+        for pair in self.border_pairs(a, b) + [None]:
+            if pair is not None and self.passable(pair[0]) and self.passable(pair[1]):
+                run.append(pair)
+                continue
+            if len(run) >= ENTRANCE_SPLIT:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+        return transitions
+
+    def set_transitions(self, key, transitions):
+        for a, b in self.transitions.get(key, ()):
+            self.inter.get(a, {}).pop(b, None)
+            self.inter.get(b, {}).pop(a, None)
+        self.transitions[key] = transitions
+        for a, b in transitions:
+            self.inter.setdefault(a, {})[b] = self.cost_fn(b[0], b[1])
+            self.inter.setdefault(b, {})[a] = self.cost_fn(a[0], a[1])
+
+    def rebuild(self, dirty):
+        """Recomputes the borders of the dirty clusters, then the intra edges of every cluster that changed."""
+        stale = set(dirty)
+        for cluster in dirty:
+            for key in self.borders_of(cluster):
+                transitions = self.find_transitions(*key)
+                if transitions != self.transitions.get(key):
+                    stale.update(key) # The neighbour's node set changed too
+                self.set_transitions(key, transitions) # Also refreshes inter edge costs
+
+        for cluster in stale:
+            nodes = set()
+            for key in self.borders_of(cluster):
+                side = 0 if key[0] == cluster else 1
+                nodes.update(pair[side] for pair in self.transitions.get(key, ()))
+            self.cluster_nodes[cluster] = nodes
+
+            costs = self.cluster_costs(cluster)
+            edges = {node: {} for node in nodes}
+            for component in self.components(nodes, costs):
+                remaining = sorted(component)
+                while remaining:
+                    # Reversing a path changes its cost by c(source) - c(target), so one
+                    # search per pair is enough: later sources skip targets already done
+                    node = remaining.pop()
+                    dist = self.dijkstra(node, costs, targets=remaining)
+                    for other in remaining:
+                        edges[node][other] = dist[other]
+                        edges[other][node] = dist[other] - costs[other] + costs[node]
+            self.intra[cluster] = edges
+            self.cluster_rebuilds += 1
+
+    def cluster_costs(self, cluster):
+        """cell -> cost of every passable cell of cluster."""
+        x0, y0, x1, y1 = self.bounds(cluster)
+        cost_fn = self.cost_fn
+        costs = {}
+        for x in range(x0, x1):
+            for y in range(y0, y1):
+                cost = cost_fn(x, y)
+                if cost != INF:
+                    costs[(x, y)] = cost
+        return costs
+
+    def components(self, nodes, costs):
+        """Groups nodes by connected region of costs, so searches never hunt for unreachable targets."""
+        groups = []
+        seen = set()
+        for node in nodes:
+            if node in seen:
+                continue
+            seen.add(node)
+            stack = [node]
+            group = []
+            while stack:
+                cell = stack.pop()
+                if cell in nodes:
+                    group.append(cell)
+                cx, cy = cell
+                for n in ((cx, cy + 1), (cx, cy - 1), (cx + 1, cy), (cx - 1, cy)):
+                    if n in costs and n not in seen:
+                        seen.add(n)
+                        stack.append(n)
+            groups.append(group)
+        return groups
+
+    def dijkstra(self, source, costs, targets=None, reverse=False):
+        """
+        Path costs from source to the cells of costs (the passable cells of one
+        cluster) without leaving them; reverse=True: from those cells to source.
+        Stops once every cell of targets is settled (None = search everything).
+        """
+        if reverse and source not in costs:
+            return {}
+        left = set(targets) if targets is not None else None
+        if left is not None and not left:
+            return {}
+
+        dist = {source: 0}
+        heap = [(0, source)]
+        while heap:
+            d, cell = heapq.heappop(heap)
+            if d > dist[cell]:
+                continue
+            self.expansions += 1
+            if left is not None:
+                left.discard(cell)
+                if not left:
+                    break
+            cx, cy = cell
+            for n in ((cx, cy + 1), (cx, cy - 1), (cx + 1, cy), (cx - 1, cy)):
+                step = costs.get(n)
+                if step is None:
+                    continue
+                new_d = d + (costs[cell] if reverse else step) # reverse: n -> cell enters cell
+                if new_d < dist.get(n, INF):
+                    dist[n] = new_d
+                    heapq.heappush(heap, (new_d, n))
+        return dist
+
+    # --- Planning ---
+
+    def plan(self, start, changed_cells=()):
+        """
+        Returns the path [start, ..., goal] (empty list if blocked).
+        changed_cells: cells whose cost changed since the previous call.
+        """
+        if not self.built:
+            self.rebuild([(cx, cy) for cx in range(self.clusters_x) for cy in range(self.clusters_y)])
+            self.built = True
+        elif changed_cells:
+            self.rebuild({self.cluster_of(cell) for cell in changed_cells})
+
+        goal = self.goal
+        if start == goal:
+            return [start]
+
+        # Link start and goal into the abstract graph
+        start_cluster, goal_cluster = self.cluster_of(start), self.cluster_of(goal)
+        start_costs = self.cluster_costs(start_cluster)
+        start_costs.setdefault(start, 0) # The robot's own cell is never entered
+        reach = self.dijkstra(start, start_costs)
+        start_edges = {n: reach[n] for n in self.cluster_nodes[start_cluster] if n in reach and n != start}
+        if goal in reach:
+            start_edges[goal] = reach[goal]
+        goal_costs = start_costs if goal_cluster == start_cluster else self.cluster_costs(goal_cluster)
+        to_goal = self.dijkstra(goal, goal_costs, reverse=True)
+        goal_edges = {n: to_goal[n] for n in self.cluster_nodes[goal_cluster] if n in to_goal}
+
+        abstract = self.search_abstract(start, start_edges, goal_edges)
+        if not abstract:
+            return []
+        return self.refine(abstract)
+
+    def search_abstract(self, start, start_edges, goal_edges):
+        """A* over the abstract graph; returns the node sequence start -> goal (empty if unreachable)."""
+        goal = self.goal
+        g = {start: 0}
+        came_from = {start: None}
+        heap = [(self.heuristic(start, goal), 0, start)] # (f, h, node): ties go to the node closer to the goal
+        closed = set()
+
+        while heap:
+            _, _, node = heapq.heappop(heap)
+            if node in closed:
+                continue
+            if node == goal:
+                nodes = []
+                while node is not None:
+                    nodes.append(node)
+                    node = came_from[node]
+                return nodes[::-1]
+            closed.add(node)
+            self.expansions += 1
+
+            if node == start:
+                edges = list(start_edges.items())
+            else:
+                edges = list(self.intra[self.cluster_of(node)].get(node, {}).items())
+                if node in goal_edges:
+                    edges.append((goal, goal_edges[node]))
+            edges += self.inter.get(node, {}).items()
+
+            for neighbor, cost in edges:
+                new_g = g[node] + cost
+                if new_g < g.get(neighbor, INF):
+                    g[neighbor] = new_g
+                    came_from[neighbor] = node
+                    h = self.heuristic(neighbor, goal)
+                    heapq.heappush(heap, (new_g + h, h, neighbor))
+        return []
+
+    def refine(self, abstract):
+        """Expands the abstract node sequence into a cell path."""
+        path = [abstract[0]]
+        for a, b in zip(abstract, abstract[1:]):
+            cluster = self.cluster_of(a)
+            if cluster != self.cluster_of(b):
+                path.append(b) # Inter edge: facing cells
+                continue
+            costs = self.cluster_costs(cluster)
+            costs.setdefault(a, 0)
+            segment = self.local_path(a, b, costs)
+            if segment is None:
+                return []
+            path += segment[1:]
+        return path
+
+    def local_path(self, source, target, costs):
+        """A* from source to target over the cells of costs (one cluster), None if there is no such path."""
+        g = {source: 0}
+        came_from = {source: None}
+        heap = [(self.heuristic(source, target), source)]
+
+        while heap:
+            _, cell = heapq.heappop(heap)
+            if cell == target:
+                path = []
+                while cell is not None:
+                    path.append(cell)
+                    cell = came_from[cell]
+                return path[::-1]
+            self.expansions += 1
+            cx, cy = cell
+            for n in ((cx, cy + 1), (cx, cy - 1), (cx + 1, cy), (cx - 1, cy)):
+                step = costs.get(n)
+                if step is None:
+                    continue
+                new_g = g[cell] + step
+                if new_g < g.get(n, INF):
+                    g[n] = new_g
+                    came_from[n] = cell
+                    heapq.heappush(heap, (new_g + self.heuristic(n, target), n))
+        return None
@@ -0,0 +1,122 @@
+import time
+from collections import deque
+
+EWMA_HALF_LIFE = 10.0   # s, a sample this old has half the weight of a fresh one
+EWMA_MIN_ALPHA = 0.2    # Weight of every new sample, even back-to-back ones
+PERCENTILE_WINDOW = 200 # Latest samples kept for p50 / p95 / p99
+OUTLIER_FACTOR = 4.0    # A sample slower than this x p50 counts as a strike
+OUTLIER_MIN_SAMPLES = 10
+BREAKER_STRIKES = 3     # Consecutive failures / outliers that open the breaker
+BREAKER_COOLDOWN = 15.0 # s the model is skipped before a single probe request is allowed
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LatencyTracker:
+    """
+    Latency statistics and circuit breaker for one model.
+
+    ewma decays with time (EWMA_HALF_LIFE), so a model that got slow wins
+    routing back within a few requests instead of after its whole history.
+    Percentiles come from the last PERCENTILE_WINDOW samples.
+
+    Failures and outliers (slower than OUTLIER_FACTOR x p50) are strikes;
+    BREAKER_STRIKES in a row open the breaker and available() stays False
+    for BREAKER_COOLDOWN seconds. After that one probe request is let
+    through (half open): success closes the breaker, a strike re-opens it.
+
+    Not locked: the owning analyzer serialises writes under its own lock.
+    """
+
+    def __init__(self, clock=time.monotonic, initial=1.0):
+        self.clock = clock
+        self.ewma = initial
+        self.samples = deque(maxlen=PERCENTILE_WINDOW)
+        self.last_sample_at = None
+
+        self.state = CLOSED
+        self.strikes = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+        # Stats
+        self.count = 0
+        self.failures = 0
+        self.outliers = 0
+        self.trips = 0
+
+    def available(self):
+        """False while the breaker is open (or its single half-open probe is in flight)."""
+        if self.state == OPEN:
+            return self.clock() - self.opened_at >= BREAKER_COOLDOWN
+        if self.state == HALF_OPEN:
+            return not self.probing
+        return True
+
+    def on_start(self):
+        """A request was sent to the model."""
+        if self.state == OPEN and self.available():
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            self.probing = True
+
+    def record(self, duration):
+        """A request finished after duration seconds."""
+        now = self.clock()
+        if self.last_sample_at is None:
+            alpha = 1.0 if self.count == 0 else EWMA_MIN_ALPHA
+        else:
+            alpha = max(EWMA_MIN_ALPHA, 1 - 0.5 ** ((now - self.last_sample_at) / EWMA_HALF_LIFE))
+        self.ewma += alpha * (duration - self.ewma)
+        self.last_sample_at = now
+        self.count += 1
+
+        is_outlier = len(self.samples) >= OUTLIER_MIN_SAMPLES and duration > OUTLIER_FACTOR * self.percentile(50)
+        self.samples.append(duration)
+        if is_outlier:
+            self.outliers += 1
+            self.strike()
+        else:
+            self.strikes = 0
+            self.state = CLOSED
+        self.probing = False
+
+    def record_failure(self):
+        """A request errored or timed out."""
+        self.failures += 1
+        self.strike()
+        self.probing = False
+
+    def record_cancel(self):
+        """A request was abandoned by the caller (says nothing about the model)."""
+        self.probing = False
+
+    def strike(self):
+        self.strikes += 1
+        if self.state == HALF_OPEN or self.strikes >= BREAKER_STRIKES:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+    def percentile(self, q):
+        """q-th percentile (0-100) of the recent samples, None before the first one."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    def snapshot(self):
+        return {
+            "ewma": self.ewma,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "count": self.count,
+            "failures": self.failures,
+            "outliers": self.outliers,
+            "state": self.state,
+            "trips": self.trips,
+        }
@@ -25,7 +25,7 @@ class GeminiAnalyzer:
     def analyze_obstacle(self, obstacle_props):
         """Engeli analiz eder ve JSON yanıtı döner."""
         # props içinden id ve color gibi gereksizleri temizle
-        clean_props = {k: v for k, v in obstacle_props.items() if k not in ["id", "color", "score"]}
+        clean_props = {k: v for k, v in obstacle_props.items() if k not in ["id", "color", "score", "type_id", "provisional"]}
         prompt = f"Analyze this obstacle: {json.dumps(clean_props)}"
         
         try:
@@ -0,0 +1,283 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LLMDispatcher:
+    """
+    Priority scheduler for LLM requests over a fleet of models.
+
+    Every model has a concurrency limit (model_limits). Waiting jobs sit in a
+    priority queue (lower value first; the simulation uses the obstacle's
+    time-to-contact) and the most urgent one is started as soon as one of its
+    models has a free slot. The dispatcher picks the model (model_rank, models
+    failing model_available are skipped) and passes it to
+    request_fn(cancel_event, model_id).
+
+    A job lists the models it belongs on ("models") and the models it may
+    borrow while they are idle ("spill"). Work running on a borrowed model is
+    preempted when a more urgent job that owns the model is waiting: its
+    generation is cancelled and it goes back to the queue.
+
+    Hedging: a job submitted with hedge_after (model_id -> seconds, or None)
+    gets a second run on another of its free models once its first run has
+    been going that long (0 = right away). The first valid result wins and
+    the other run is cancelled. Hedges only use idle slots, never ones a
+    waiting job could take.
+
+    cancel() is real: a waiting job never starts, a running one gets its
+    cancel_event set (the analyzer checks it and stops) and its result is
+    never delivered. Finished results are delivered through a completion
+    queue drained by poll() on the game loop.
+
+    With inline_clock set (stand-in backends on the simulated clock) requests
+    run synchronously when they start and hold their model slot until
+    inline_clock() reaches their "_meta_ready_at" (the latest one for batched
+    results), which keeps headless runs deterministic.
+
+    Jobs are the caller's own dicts; the dispatcher adds "cancel_event",
+    "done", "priority", "models", "spill", "model" and "runs" keys to them
+    ("model" is the model that produced the delivered result).
+    """
+
+    def __init__(self, model_limits, inline_clock=None, model_rank=None, model_available=None):
+        self.model_limits = dict(model_limits)
+        self.inline_clock = inline_clock
+        self.model_rank = model_rank or (lambda model_id: 0.0)                # Orders free models (lower first)
+        self.model_available = model_available or (lambda model_id: True)     # e.g. circuit breaker closed
+        self.executor = None if inline_clock else ThreadPoolExecutor(
+            max_workers=sum(self.model_limits.values()), thread_name_prefix="llm")
+
+        self.pending = []                                 # (priority, seq, job) waiting for a slot
+        self.running = {m: [] for m in self.model_limits} # model -> runs holding its slots
+        self.completed = queue.Queue()                    # (job, result) from worker threads
+        self.scheduled = []                               # (ready_at, seq, run, result) for inline mode
+        self.seq = itertools.count()
+        self.lock = threading.RLock()
+
+        # Stats
+        self.submitted = 0
+        self.cancelled = 0
+        self.preempted = 0
+        self.hedged = 0     # Hedge runs started
+        self.hedge_wins = 0 # ... that answered first
+
+    def submit(self, job, request_fn, models, priority=0.0, spill=(), hedge_after=None):
+        """Queues request_fn(cancel_event, model_id) -> result for job on one of models."""
+        job["cancel_event"] = threading.Event()
+        job["done"] = False
+        job["priority"] = priority
+        job["models"] = list(models)
+        job["spill"] = [m for m in spill if m not in job["models"]]
+        job["request_fn"] = request_fn
+        job["hedge_after"] = hedge_after
+        job["hedged"] = False
+        job["model"] = None
+        job["runs"] = []
+        self.submitted += 1
+
+        with self.lock:
+            heapq.heappush(self.pending, (priority, next(self.seq), job))
+            self.schedule()
+
+    def free_model(self, candidates):
+        free = [m for m in candidates
+                if len(self.running[m]) < self.model_limits[m] and self.model_available(m)]
+        if not free:
+            return None
+        return min(free, key=self.model_rank)
+
+    def schedule(self):
+        """Starts waiting jobs in priority order while their models have free slots (caller holds self.lock)."""
+        waiting = []
+        while self.pending:
+            entry = heapq.heappop(self.pending)
+            job = entry[2]
+            if job["cancel_event"].is_set():
+                continue
+
+            model_id = self.free_model(job["models"]) or self.free_model(job["spill"])
+            if model_id is None and self.preempt_for(job):
+                model_id = self.free_model(job["models"])
+            if model_id is None:
+                waiting.append(entry)
+                continue
+            self.start(job, model_id)
+
+        for entry in waiting:
+            heapq.heappush(self.pending, entry)
+
+    def preempt_for(self, job):
+        """
+        Preempts the least urgent borrowed run on one of job's models.
+        Returns True if its slot is already free (inline mode); worker threads free it when they stop.
+        """
+        runs = [run for m in job["models"] for run in self.running[m]]
+        if any(run["preempted"] for run in runs):
+            return False # Already making room, wait for it
+        borrowed = [run for run in runs
+                    if run["model"] not in run["job"]["models"] and run["job"]["priority"] > job["priority"]]
+        if not borrowed:
+            return False
+
+        victim = max(borrowed, key=lambda run: run["job"]["priority"])
+        victim["preempted"] = True
+        victim["cancel_event"].set()
+        self.preempted += 1
+        print(f"[SCHEDULER] Preempting borrowed {victim['model']} slot for a more urgent request")
+
+        if self.inline_clock:
+            # The stand-in generation is simply dropped
+            self.finish(victim)
+            return True
+        return False
+
+    def now(self):
+        return self.inline_clock() if self.inline_clock else time.monotonic()
+
+    def start(self, job, model_id, hedge=False):
+        run = {"job": job, "model": model_id, "cancel_event": threading.Event(), "preempted": False,
+               "started_at": self.now(), "hedge": hedge}
+        job["runs"].append(run)
+        self.running[model_id].append(run)
+
+        if self.inline_clock:
+            result = job["request_fn"](run["cancel_event"], model_id)
+            ready_at = self.inline_clock()
+            # Batched requests return one result per obstacle, all ready together
+            results = result if isinstance(result, list) else [result]
+            ready_times = [r["_meta_ready_at"] for r in results if r and "_meta_ready_at" in r]
+            if ready_times:
+                ready_at = max(ready_times)
+            heapq.heappush(self.scheduled, (ready_at, next(self.seq), run, result))
+            return
+
+        def deliver(future):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[LLM Error] Worker failed: {e}")
+                result = None
+            with self.lock:
+                self.finish(run)
+                if not run["cancel_event"].is_set() and self.accept(run, result):
+                    self.completed.put((job, result))
+                self.schedule()
+
+        self.executor.submit(job["request_fn"], run["cancel_event"], model_id).add_done_callback(deliver)
+
+    def finish(self, run):
+        """Releases run's model slot; a preempted job goes back to the queue (caller holds self.lock)."""
+        if run in self.running[run["model"]]:
+            self.running[run["model"]].remove(run)
+        job = run["job"]
+        if run in job["runs"]:
+            job["runs"].remove(run)
+        if run["preempted"] and not job["runs"] and not job["cancel_event"].is_set():
+            heapq.heappush(self.pending, (job["priority"], next(self.seq), job))
+
+    def accept(self, run, result):
+        """
+        Decides whether run's (finished) result is delivered for its job (caller holds self.lock).
+        An invalid result is held back while a hedge of the same job may still answer.
+        """
+        valid = result is not None and not (isinstance(result, list) and all(r is None for r in result))
+        job = run["job"]
+        if not valid and job["runs"]:
+            return False
+        job["model"] = run["model"]
+        if run["hedge"]:
+            self.hedge_wins += 1
+        for other in list(job["runs"]):
+            other["cancel_event"].set() # First valid verdict wins, drop the loser
+            if self.inline_clock:
+                self.finish(other)
+        return True
+
+    def check_hedges(self):
+        """Starts hedge runs for jobs whose only run has been going for longer than hedge_after (caller holds self.lock)."""
+        if any(not job["cancel_event"].is_set() for _, _, job in self.pending):
+            return # Idle capacity only
+        now = self.now()
+        for runs in list(self.running.values()):
+            for run in list(runs):
+                job = run["job"]
+                if job["hedge_after"] is None or job["hedged"] or run["cancel_event"].is_set():
+                    continue
+                delay = job["hedge_after"](run["model"])
+                if delay is None or now - run["started_at"] < delay:
+                    continue
+                model_id = self.free_model([m for m in job["models"] if m != run["model"]])
+                if model_id is not None:
+                    self.hedged += 1
+                    job["hedged"] = True
+                    print(f"[SCHEDULER] Hedging {run['model']} request on {model_id}")
+                    self.start(job, model_id, hedge=True)
+
+    def cancel(self, job):
+        """Cancels job; its result (if any) is dropped."""
+        if job.get("done") or job["cancel_event"].is_set():
+            return
+        with self.lock:
+            job["cancel_event"].set()
+            for run in list(job["runs"]):
+                run["cancel_event"].set()
+                if self.inline_clock:
+                    self.finish(run)
+            if self.inline_clock:
+                self.schedule()
+            self.cancelled += 1
+
+    def is_active(self, job):
+        return not job.get("done") and not job["cancel_event"].is_set()
+
+    def poll(self):
+        """Returns the (job, result) pairs that completed since the last call."""
+        finished = []
+
+        with self.lock:
+            if self.inline_clock:
+                now = self.inline_clock()
+                while self.scheduled and self.scheduled[0][0] <= now:
+                    _, _, run, result = heapq.heappop(self.scheduled)
+                    if run["cancel_event"].is_set():
+                        continue # Preempted or cancelled, slot already released
+                    self.finish(run)
+                    if self.accept(run, result):
+                        finished.append((run["job"], result))
+                self.schedule()
+                self.check_hedges()
+            else:
+                while True:
+                    try:
+                        job, result = self.completed.get_nowait()
+                    except queue.Empty:
+                        break
+                    # Cancelled between finishing and being polled
+                    if not job["cancel_event"].is_set():
+                        finished.append((job, result))
+                # Models can become available without a request finishing (breaker cooldown)
+                if self.pending:
+                    self.schedule()
+                self.check_hedges()
+
+        for job, _ in finished:
+            job["done"] = True
+        return finished
+
+    def in_flight(self):
+        """Requests holding a model slot right now."""
+        with self.lock:
+            return sum(len(runs) for runs in self.running.values())
+
+    def waiting(self):
+        """Requests queued for a free slot."""
+        with self.lock:
+            return sum(1 for _, _, job in self.pending if not job["cancel_event"].is_set())
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
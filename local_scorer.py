@@ -0,0 +1,88 @@
+import math
+import re
+from collections import Counter
+
+LOCAL_ACCEPT_CONFIDENCE = 0.6       # Similarity above which the local score is final (no LLM call)
+LOCAL_PROVISIONAL_CONFIDENCE = 0.15 # ... above which the planner uses it while the LLM confirms
+NEIGHBOURS = 3
+
+STOP_WORDS = {"a", "an", "the", "of", "with", "and", "no", "but", "to", "looks", "very", "object", "surface"}
+
+
+def tokenize(props):
+    """Bag of crude word stems from type / visual / physics."""
+    text = " ".join([str(props.get("type", "")).replace("_", " "),
+                     str(props.get("visual", "")), str(props.get("physics", ""))]).lower()
+    tokens = []
+    for word in re.findall(r"[a-z]+", text):
+        if len(word) < 3 or word in STOP_WORDS:
+            continue
+        for suffix in ("ing", "ed", "ly", "s"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+                word = word[:-len(suffix)]
+                break
+        tokens.append(word)
+    return tokens
+
+
+class LocalScorer:
+    """
+    In-process TF-IDF nearest-neighbour scorer over obstacles with a known score.
+
+    Seeded with the predefined knowledge base and extended with every LLM
+    verdict (learn). estimate() returns (score, confidence, nearest_type):
+    score is the similarity-weighted mean of the NEIGHBOURS closest examples
+    and confidence the cosine similarity of the closest one (0..1).
+    """
+
+    def __init__(self, examples=()):
+        self.examples = {} # type -> (tokens, score)
+        for props, score in examples:
+            self.examples[props["type"]] = (tokenize(props), score)
+
+        self.vectors = None # Rebuilt lazily after learn(): [(type, score, vector)], idf
+        self.idf = None
+
+        # Stats
+        self.estimates = 0
+
+    def learn(self, props, score):
+        self.examples[props["type"]] = (tokenize(props), score)
+        self.vectors = None
+
+    def vectorize(self, tokens):
+        counts = Counter(tokens)
+        vector = {w: n * self.idf.get(w, self.default_idf) for w, n in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {w: v / norm for w, v in vector.items()}
+
+    def rebuild(self):
+        n = len(self.examples)
+        df = Counter(w for tokens, _ in self.examples.values() for w in set(tokens))
+        self.idf = {w: math.log((1 + n) / (1 + count)) + 1 for w, count in df.items()}
+        self.default_idf = math.log(1 + n) + 1
+        self.vectors = [(obs_type, score, self.vectorize(tokens))
+                        for obs_type, (tokens, score) in self.examples.items()]
+
+    def estimate(self, props):
+        """(score, confidence, nearest_type), or None if nothing is similar at all."""
+        if not self.examples:
+            return None
+        if self.vectors is None:
+            self.rebuild()
+        self.estimates += 1
+
+        query = self.vectorize(tokenize(props))
+        scored = []
+        for obs_type, score, vector in self.vectors:
+            similarity = sum(weight * vector.get(w, 0.0) for w, weight in query.items())
+            if similarity > 0:
+                scored.append((similarity, obs_type, score))
+        if not scored:
+            return None
+
+        scored.sort(reverse=True)
+        top = scored[:NEIGHBOURS]
+        total = sum(similarity for similarity, _, _ in top)
+        score = int(round(sum(similarity * s for similarity, _, s in top) / total))
+        return score, top[0][0], top[0][1]
@@ -0,0 +1,166 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import simulation
+from benchmark import SCENARIOS, run_mission
+
+# What log_mission_complete records per mission, plus the success flag
+MC_METRICS = ["reached_goal", "time_to_goal", "steps", "replans", "llm_calls", "obstacles_found"]
+MC_PERCENTILES = [5, 50, 95]
+# Constants RobotSimulation takes as default arguments (bound at import, so patching
+# the module has no effect): --const sets the scenario key run_mission passes instead
+CONSTANT_KEYS = {
+    "MAP_WIDTH": "width",
+    "MAP_HEIGHT": "height",
+    "PLANNER_MODE": "planner_mode",
+    "SENSOR_RANGE": "sensor_range",
+    "LLM_HEDGE_MODE": "hedge_mode",
+    "LOCAL_SCORER_ENABLED": "local_scorer",
+    "PLANNER_FRAME_BUDGET": "planner_budget",
+    "PLANNER_FRAME_EXPANSIONS": "planner_expansions",
+    "FLEET_SIZE": "fleet_size",
+}
+# Names --const cannot change: bound at import (run_headless tick, profiler switch) or shared with grid.py
+FIXED_CONSTANTS = {"TICK_RATE", "PROFILE_ENABLED", "PROFILE_PATH", "INF", "HIDDEN"}
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values, nearest rank (same convention as LatencyTracker)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(runs):
+    """metric -> {"mean", "p5", "p50", "p95"} over the missions of one scenario."""
+    summary = {}
+    for metric in MC_METRICS:
+        values = [r[metric] for r in runs]
+        stats = {"mean": sum(values) / len(values)}
+        for q in MC_PERCENTILES:
+            stats[f"p{q}"] = percentile(values, q)
+        summary[metric] = stats
+    return summary
+
+
+def run_job(job):
+    """
+    Worker entry point: one seeded mission with its own simulator and stand-in analyzer.
+    scenario["constants"] (name -> value) patches simulation module thresholds for this
+    mission only, e.g. LOCAL_SAFETY_MARGIN or LLM_BATCH_WINDOW_DISTANT.
+    """
+    scenario, seed, max_sim_time = job
+    constants = scenario.get("constants", {})
+    saved = {name: getattr(simulation, name) for name in constants}
+    try:
+        for name, value in constants.items():
+            setattr(simulation, name, value)
+        return run_mission(scenario, seed, max_sim_time)
+    finally:
+        for name, value in saved.items():
+            setattr(simulation, name, value)
+
+
+def run_monte_carlo(scenarios, seeds, max_sim_time, workers=None):
+    """
+    Runs every scenario once per seed across a process pool.
+    Returns scenario name -> summarize() of its missions.
+
+    Missions are independent: scenarios that share a decision store across
+    seeds (shared_store) run cold here, since that store is sequential by design.
+    """
+    jobs = [(scenario, seed, max_sim_time) for scenario in scenarios for seed in seeds]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        runs = list(pool.map(run_job, jobs))
+
+    results = {}
+    for i, scenario in enumerate(scenarios):
+        results[scenario["name"]] = summarize(runs[i * len(seeds):(i + 1) * len(seeds)])
+    return results
+
+
+def parse_override(text):
+    """'key=value' -> (key, value); value is JSON if it parses (numbers, null, true), else a string."""
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def print_summary(results, missions):
+    columns = ["mean"] + [f"p{q}" for q in MC_PERCENTILES]
+    for name, summary in results.items():
+        print(f"{name} ({missions} missions)")
+        print(f"  {'metric':<18}" + "".join(f"{c:>12}" for c in columns))
+        for metric, stats in summary.items():
+            print(f"  {metric:<18}" + "".join(f"{stats[c]:>12.2f}" for c in columns))
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo mission runner: seeded missions on a process pool.")
+    parser.add_argument("--scenario", action="append",
+                        help="Benchmark scenario(s) to run (default: dstar_default)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a scenario key in every scenario, e.g. hedge_mode=both or sensor_range=6")
+    parser.add_argument("--const", action="append", default=[], metavar="NAME=VALUE",
+                        help="Override a simulation.py constant, e.g. LOCAL_SAFETY_MARGIN=10")
+    parser.add_argument("--missions", type=int, default=200, help="Seeds per scenario")
+    parser.add_argument("--first-seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--max-sim-time", type=float, default=600.0)
+    parser.add_argument("--json", help="Also write the summaries to this file")
+    args = parser.parse_args(argv)
+
+    names = args.scenario or ["dstar_default"]
+    known = {s["name"]: s for s in SCENARIOS}
+    unknown = [n for n in names if n not in known]
+    if unknown:
+        print(f"[MC] Unknown scenario(s): {', '.join(unknown)}")
+        return 1
+
+    overrides = dict(parse_override(text) for text in args.set)
+    constants = dict(parse_override(text) for text in args.const)
+    missing = [name for name in constants if not hasattr(simulation, name)]
+    if missing:
+        print(f"[MC] simulation.py has no constant(s): {', '.join(missing)}")
+        return 1
+    fixed = [name for name in constants if name in FIXED_CONSTANTS]
+    if fixed:
+        print(f"[MC] Cannot override (bound at import): {', '.join(fixed)}")
+        return 1
+    keyed = {CONSTANT_KEYS[name]: value for name, value in constants.items() if name in CONSTANT_KEYS}
+    both = [key for key in keyed if key in overrides]
+    if both:
+        parser.error(f"set by both --set and --const: {', '.join(both)}")
+    patched = {name: value for name, value in constants.items() if name not in CONSTANT_KEYS}
+
+    scenarios = []
+    for name in names:
+        scenario = {**known[name], **overrides, **keyed}
+        if patched:
+            scenario["constants"] = patched
+        labels = {**overrides, **constants}
+        if labels:
+            scenario["name"] = name + "".join(f" {k}={v}" for k, v in labels.items())
+        scenarios.append(scenario)
+    seeds = list(range(args.first_seed, args.first_seed + args.missions))
+
+    wall_start = time.perf_counter()
+    results = run_monte_carlo(scenarios, seeds, args.max_sim_time, args.workers)
+    wall_time = time.perf_counter() - wall_start
+
+    print_summary(results, args.missions)
+    print(f"[MC] {len(scenarios) * args.missions} missions in {wall_time:.1f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"missions": args.missions, "first_seed": args.first_seed, "scenarios": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
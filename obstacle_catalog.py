@@ -0,0 +1,71 @@
+import numpy as np
+
+UNSCORED = -1                # scores[] entry of a type nobody has scored yet
+MYSTERY_COLOR = (200, 0, 200) # Unknown objects are drawn purple until they get a verdict
+
+
+def score_to_color(score):
+    """Score (0-100) -> RGB: green (0) to red (100)."""
+    red_val = max(0, min(255, int(255 * (score / 100))))
+    green_val = max(0, min(255, int(255 * (1 - (score / 100)))))
+    return (red_val, green_val, 0)
+
+
+# Color per integer score
+SCORE_COLORS = np.array([score_to_color(s) for s in range(101)], dtype=np.uint8)
+
+
+class ObstacleCatalog:
+    """
+    Obstacle templates compiled once into small integer type ids.
+
+    Type id i is templates[i]. known_ids / unknown_ids split the ids by
+    whether the knowledge base scores them, scores[i] is the current score of
+    the type (UNSCORED until a verdict arrives) and colors[i] its color, kept
+    in step with it, so per-cell lookups are plain array reads. Discovered
+    cells are indexed by id in RobotSimulation.type_cells.
+    """
+
+    def __init__(self, templates, known_scores):
+        self.templates = [dict(t) for t in templates]
+        self.types = [t["type"] for t in self.templates]
+        self.type_ids = {name: i for i, name in enumerate(self.types)}
+
+        self.known_ids = [i for i, name in enumerate(self.types) if name in known_scores]
+        self.unknown_ids = [i for i, name in enumerate(self.types) if name not in known_scores]
+        self.unknown_id_set = set(self.unknown_ids)
+
+        n = len(self.types)
+        self.scores = np.full(n, UNSCORED, dtype=np.int16)
+        self.colors = np.tile(np.array(MYSTERY_COLOR, dtype=np.uint8), (n, 1))
+        for name, score in known_scores.items():
+            if name in self.type_ids:
+                self.set_score(self.type_ids[name], score)
+
+    def set_score(self, type_id, score):
+        score = max(0, min(100, int(score)))
+        self.scores[type_id] = score
+        self.colors[type_id] = SCORE_COLORS[score]
+
+    def score(self, type_id):
+        """Current score of the type, None while it is unscored."""
+        score = int(self.scores[type_id])
+        return None if score == UNSCORED else score
+
+    def color(self, type_id):
+        return tuple(self.colors[type_id].tolist())
+
+    def instantiate(self, type_id):
+        """
+        Fresh props dict for one obstacle of the type (id is left to the caller).
+        Knowledge-base types come with their score and color; unknown types start
+        purple and unscored even if a verdict is cached (the decision logic applies it).
+        """
+        props = self.templates[type_id].copy()
+        props["type_id"] = type_id
+        if type_id in self.unknown_id_set:
+            props["color"] = MYSTERY_COLOR
+        else:
+            props["color"] = self.color(type_id)
+            props["score"] = self.score(type_id)
+        return props
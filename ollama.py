@@ -1,7 +1,24 @@
 import requests
 import json
+import hashlib
+import re
 import threading
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+from latency import LatencyTracker
+
+# --- HTTP AYARLARI ---
+OLLAMA_URL = "http://localhost:11434/api/chat"
+CONNECT_TIMEOUT = 3.0   # s, Ollama is local: a slow connect means it is down
+READ_TIMEOUT = 60.0     # s, upper bound for one generation (stuck model guard)
+MAX_RETRIES = 2         # Connect errors / 502-503-504 only, a timed-out generation is not retried
+BACKOFF_FACTOR = 0.5    # 0.5s, 1s, ... between retries
+POOL_SIZE = 4           # Keep-alive connections per model
+STREAM_RESPONSES = True # Read the NDJSON stream and stop generating once the verdict is parsed
+
+CLUSTER_B_MODEL = "deepseek-r1:1.5b" # Distant / background analysis
 
 class OllamaAnalyzer:
     def __init__(self):
@@ -11,16 +28,24 @@ class OllamaAnalyzer:
             "qwen2.5:1.5b",
             "deepseek-r1:1.5b"
         ]
+        self.cluster_a = self.models[:2]      # Close obstacles (load balanced)
+        self.cluster_b = [CLUSTER_B_MODEL]    # Distant / background analysis
         
         # Load Balance State
         self.queue_depths = {m: 0 for m in self.models}
-        self.avg_times = {m: 1.0 for m in self.models} # Default 1s
-        self.counts = {m: 0 for m in self.models}     # For moving average
+        self.latency = {m: LatencyTracker(initial=1.0) for m in self.models} # EWMA / percentiles / breaker
+        self.conn_stats = {m: {"requests": 0, "errors": 0, "timeouts": 0, "retries": 0, "connections": 0}
+                           for m in self.models}
         
         self.active_ids = set() # Deduplication
         self.lock = threading.Lock()
         
-        self.api_url = "http://localhost:11434/api/chat"
+        self.api_url = OLLAMA_URL
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.stream = STREAM_RESPONSES
+
+        # One pooled keep-alive session per model endpoint
+        self.sessions = {m: self.create_session() for m in self.models}
         
         # System prompt'u yükle
         try:
@@ -29,42 +54,85 @@ class OllamaAnalyzer:
         except FileNotFoundError:
             self.system_prompt = "Analyze logic for robot navigation. Output JSON with 'score', 'rationale', and 'label'."
 
-    def is_at_capacity(self, limit):
-        """Checks if all models have reached the queue limit."""
+        # Persisted verdicts are only reused for the same prompt
+        self.prompt_version = hashlib.sha256(self.system_prompt.encode("utf-8")).hexdigest()[:12]
+
+    def create_session(self):
+        """requests.Session with a bounded keep-alive pool and retry/backoff on transient failures."""
+        retry = Retry(
+            total=MAX_RETRIES,
+            connect=MAX_RETRIES,
+            read=False, # Re-raise read timeouts as-is instead of retrying a stuck generation
+            status=MAX_RETRIES,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=["POST"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def update_connection_stats(self, model_id, response=None):
+        """Refreshes retry / opened-connection counters for model_id (caller holds self.lock)."""
+        stats = self.conn_stats[model_id]
+        if response is not None:
+            retries = getattr(response.raw, "retries", None)
+            if retries is not None:
+                stats["retries"] += len(retries.history)
+
+        # Connections opened so far; with keep-alive this stays far below "requests"
+        pools = self.sessions[model_id].get_adapter(self.api_url).poolmanager.pools
+        stats["connections"] = sum(pools[key].num_connections for key in pools.keys())
+
+    def get_connection_stats(self):
+        """Snapshot of per-model connection stats (requests, errors, timeouts, retries, connections)."""
         with self.lock:
-            # If ANY model is below limit, we are not at capacity
-            # (Because select_best_model will pick that one)
-            for m in self.models[:2]: # Only check Cluster A models
-                if self.queue_depths[m] < limit:
-                    return False
-            return True
+            return {m: dict(s) for m, s in self.conn_stats.items()}
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
 
     def select_best_model(self):
         """
         Load Balancing Algorithm:
-        1. Priority: Free models (Queue=0) -> Pick fastest avg_time.
-        2. Fallback: Lowest Queue -> Tie-break fastest avg_time.
+        0. Skip models whose circuit breaker is open (unless all of them are).
+        1. Priority: Free models (Queue=0) -> Pick lowest latency EWMA.
+        2. Fallback: Lowest Queue -> Tie-break lowest latency EWMA.
         """
-        cluster_a = self.models[:2] # Restricted to first 2 models
+        cluster_a = self.cluster_a
         with self.lock:
+            candidates = [m for m in cluster_a if self.latency[m].available()] or cluster_a
+
             # 1. Look for free models
-            free_models = [m for m in cluster_a if self.queue_depths[m] == 0]
+            free_models = [m for m in candidates if self.queue_depths[m] == 0]
             if free_models:
-                # Pick the one with lowest average response time
-                return min(free_models, key=lambda m: self.avg_times[m])
+                # Pick the one with lowest recent response time
+                return min(free_models, key=lambda m: self.latency[m].ewma)
             
             # 2. All busy, pick lowest queue
-            return min(cluster_a, key=lambda m: (self.queue_depths[m], self.avg_times[m]))
+            return min(candidates, key=lambda m: (self.queue_depths[m], self.latency[m].ewma))
 
-    def analyze_distant_obstacle(self, obstacle_props, context_examples=None):
+    def is_available(self, model_id):
+        """False while the model's circuit breaker is open."""
+        with self.lock:
+            return self.latency[model_id].available()
+
+    def get_latency_stats(self):
+        """Per-model snapshot: ewma, p50, p95, p99, count, failures, outliers, state, trips."""
+        with self.lock:
+            return {m: tracker.snapshot() for m, tracker in self.latency.items()}
+
+    def analyze_obstacle(self, obstacle_props, context_examples=None, forced_model=None, cancel_event=None,
+                         record_latency=True):
         """
-        Specialized routing for 'distant' objects (Cluster B).
-        Forces usage of deepseek-r1:1.5b as requested.
+        Send obstacle to Ollama via Load Balancer.
+        Returns None if cancel_event (threading.Event) gets set before the verdict is ready.
+        record_latency=False keeps the call out of the latency stats (warmup: model load time).
         """
-        return self.analyze_obstacle(obstacle_props, context_examples, forced_model="deepseek-r1:1.5b")
-
-    def analyze_obstacle(self, obstacle_props, context_examples=None, forced_model=None):
-        """Send obstacle to Ollama via Load Balancer."""
         
         obs_id = obstacle_props.get("id")
         
@@ -74,23 +142,94 @@ class OllamaAnalyzer:
                 if obs_id in self.active_ids:
                     return None # Already processing
                 self.active_ids.add(obs_id)
+
+        user_content = f"Analyze this obstacle: {json.dumps(self.clean_props(obstacle_props))}"
+        reply = self.send_chat(user_content, [obs_id], context_examples, forced_model, cancel_event,
+                               record_latency)
+        if reply is None:
+            return None
+
+        result, model_id, duration = reply
+        if not isinstance(result, dict):
+            result = {"score": 50, "rationale": "Unexpected JSON shape", "label": "Unknown"}
+        self.sanitize_score(result)
+
+        # Metadata for the caller
+        result["_meta_model"] = model_id
+        result["_meta_duration"] = duration
         
+        return result
+
+    def analyze_batch(self, props_list, context_examples=None, forced_model=None, cancel_event=None):
+        """
+        Analyzes several obstacles in ONE chat request.
+        Returns a list aligned with props_list (None where the model gave no usable verdict).
+        """
+        if len(props_list) == 1:
+            return [self.analyze_obstacle(props_list[0], context_examples, forced_model, cancel_event)]
+
+        obs_ids = [p.get("id") for p in props_list]
+        with self.lock:
+            self.active_ids.update(obs_ids)
+
+        items = [dict(self.clean_props(p), index=i) for i, p in enumerate(props_list)]
+        user_content = (
+            "Analyze each of these obstacles independently. Reply with a JSON object of the form "
+            '{"verdicts": [{"index": <index>, "score": <0-100>, "rationale": "...", "label": "..."}]} '
+            f"with exactly one verdict per obstacle: {json.dumps(items)}"
+        )
+        reply = self.send_chat(user_content, obs_ids, context_examples, forced_model, cancel_event)
+        if reply is None:
+            return [None] * len(props_list)
+
+        parsed, model_id, duration = reply
+        verdicts = parsed.get("verdicts") if isinstance(parsed, dict) else parsed
+        if not isinstance(verdicts, list):
+            verdicts = []
+
+        # Map verdicts back by their index (fall back to position if the model dropped it)
+        results = [None] * len(props_list)
+        for position, verdict in enumerate(verdicts):
+            if not isinstance(verdict, dict) or "score" not in verdict:
+                continue
+            try:
+                idx = int(verdict.get("index", position))
+            except (TypeError, ValueError):
+                idx = position
+            if 0 <= idx < len(results) and results[idx] is None:
+                self.sanitize_score(verdict)
+                verdict["_meta_model"] = model_id
+                verdict["_meta_duration"] = duration
+                verdict["_meta_batch_size"] = len(props_list)
+                results[idx] = verdict
+
+        return results
+
+    def clean_props(self, obstacle_props):
+        return {k: v for k, v in obstacle_props.items() if k not in ["id", "color", "score", "type_id", "provisional"]}
+
+    def send_chat(self, user_content, obs_ids, context_examples=None, forced_model=None, cancel_event=None,
+                  record_latency=True):
+        """
+        Runs one chat request through the load balancer and parses the JSON reply.
+        Returns (parsed, model_id, duration), or None on error / cancellation.
+        obs_ids are released from active_ids when the request finishes.
+        """
         # Select Model
         if forced_model:
             model_id = forced_model
         else:
             model_id = self.select_best_model()
         
+        tracker = self.latency[model_id] if record_latency else LatencyTracker()
         with self.lock:
             self.queue_depths[model_id] += 1
+            self.conn_stats[model_id]["requests"] += 1
+            tracker.on_start()
             
         start_t = time.time()
         
         try:
-            clean_props = {k: v for k, v in obstacle_props.items() if k not in ["id", "color", "score"]}
-            
-            user_content = f"Analyze this obstacle: {json.dumps(clean_props)}"
-            
             # Few-Shot Context Logic
             final_messages = [{"role": "system", "content": self.system_prompt}]
             
@@ -105,89 +244,188 @@ class OllamaAnalyzer:
             payload = {
                 "model": model_id,
                 "messages": final_messages,
-                "stream": False,
+                "stream": self.stream,
                 "format": "json"
             }
+
+            if cancel_event is not None and cancel_event.is_set():
+                # Cancelled before the request went out (e.g. priority upgrade)
+                with self.lock:
+                    self.queue_depths[model_id] -= 1
+                    tracker.record_cancel()
+                    self.active_ids.difference_update(obs_ids)
+                return None
             
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()
-            
-            data = response.json()
-            content = data["message"]["content"]
-            
-            # Parsing
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # Fallback extraction
-                import re
-                match = re.search(r'\{.*\}', content, re.DOTALL)
-                if match:
-                    try:
-                        result = json.loads(match.group(0))
-                    except:
-                        result = {"score": 50, "rationale": "JSON Parse Failed", "label": "Unknown"}
-                else:
-                    result = {"score": 50, "rationale": "Raw Parse Failed", "label": "Unknown"}
-
-            # SANITIZE SCORE: Ensure it is an integer
-            if "score" in result:
-                val = result["score"]
-                if isinstance(val, str):
-                    # Handle ranges like "81-100" -> take max to be safe/conservative
-                    import re
-                    # Find all numbers
-                    nums = re.findall(r'\d+', val)
-                    if nums:
-                        # Take the average or max? 
-                        # Safety-critical: Max is safer (treat as wall if unsure)
-                        # But average is more representative. 
-                        # Let's take the first number found to keep it simple, or max.
-                        # "81-100" -> 100 (Wall). "10-20" -> 20.
-                        ints = [int(n) for n in nums]
-                        result["score"] = max(ints)
-                    else:
-                        result["score"] = 50 # Default if no numbers found
-                elif isinstance(val, (int, float)):
-                    result["score"] = int(val)
+            # Closed on every way out, so a failed streamed reply does not hold its pooled connection
+            with self.sessions[model_id].post(self.api_url, json=payload, timeout=self.timeout,
+                                              stream=self.stream) as response:
+                with self.lock:
+                    self.update_connection_stats(model_id, response)
+                response.raise_for_status()
+
+                if self.stream:
+                    parsed = self.read_stream(response, len(obs_ids), cancel_event)
+                    if parsed is None:
+                        # Cancelled mid-generation, the connection was dropped to stop it
+                        with self.lock:
+                            self.queue_depths[model_id] -= 1
+                            tracker.record_cancel()
+                            self.active_ids.difference_update(obs_ids)
+                        return None
                 else:
-                    result["score"] = 50
+                    data = response.json()
+                    parsed = self.parse_content(data["message"]["content"])
 
             duration = time.time() - start_t
             
             # Update Stats
             with self.lock:
                 self.queue_depths[model_id] -= 1
-                # Simple Moving Average
-                n = self.counts[model_id]
-                self.avg_times[model_id] = (self.avg_times[model_id] * n + duration) / (n + 1)
-                self.counts[model_id] += 1
-                self.active_ids.discard(obs_id)
-
-            # Metadata for the caller
-            result["_meta_model"] = model_id
-            result["_meta_duration"] = duration
-            
-            return result
+                tracker.record(duration)
+                self.active_ids.difference_update(obs_ids)
+
+            if cancel_event is not None and cancel_event.is_set():
+                return None # Caller no longer wants this verdict
+
+            return parsed, model_id, duration
             
+        except requests.exceptions.Timeout as e:
+            print(f"[LLM Error] Timeout with {model_id}: {e}")
+            with self.lock:
+                self.queue_depths[model_id] -= 1
+                self.conn_stats[model_id]["timeouts"] += 1
+                self.conn_stats[model_id]["errors"] += 1
+                tracker.record_failure()
+                self.active_ids.difference_update(obs_ids)
+            return None
         except requests.exceptions.RequestException as e:
             print(f"[LLM Error] Connection error with {model_id}: {e}")
             with self.lock:
                 self.queue_depths[model_id] -= 1
-                self.active_ids.discard(obs_id)
+                self.conn_stats[model_id]["errors"] += 1
+                tracker.record_failure()
+                if e.args and isinstance(e.args[0], MaxRetryError):
+                    self.conn_stats[model_id]["retries"] += MAX_RETRIES
+                self.active_ids.difference_update(obs_ids)
             return None
         except json.JSONDecodeError as e:
             print(f"[LLM Error] JSON Decode Error with {model_id}: {e}")
             with self.lock:
                 self.queue_depths[model_id] -= 1
-                self.active_ids.discard(obs_id)
+                self.conn_stats[model_id]["errors"] += 1
+                tracker.record_failure()
+                self.active_ids.difference_update(obs_ids)
             return None
         except Exception as e:
             print(f"[LLM Error] Unexpected error with {model_id}: {e}")
             with self.lock:
                 self.queue_depths[model_id] -= 1
-                self.active_ids.discard(obs_id)
+                self.conn_stats[model_id]["errors"] += 1
+                tracker.record_failure()
+                self.active_ids.difference_update(obs_ids)
+            return None
+
+    def read_stream(self, response, expected, cancel_event=None):
+        """
+        Consumes Ollama's NDJSON stream and returns the parsed reply as soon as
+        extract_early_verdict finds the verdict(s), without waiting for the rest
+        of the generation. Closing the response drops the connection, which makes
+        Ollama stop generating. Returns None if cancel_event gets set meanwhile.
+        """
+        content = ""
+        try:
+            for line in response.iter_lines():
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+
+                content += chunk.get("message", {}).get("content", "")
+                early = self.extract_early_verdict(content, expected)
+                if early is not None:
+                    return early
+                if chunk.get("done"):
+                    break
+        finally:
+            response.close()
+        return self.parse_content(content)
+
+    def extract_early_verdict(self, content, expected):
+        """
+        Verdict from a partial reply, or None if it is not complete yet.
+        Single obstacle: as soon as "score" is a finished integer (the prompt puts it first);
+        "label" usually comes later, so it is None (not persisted) unless it already streamed.
+        Batch: once all `expected` verdict objects are closed.
+        """
+        # Reasoning models may think out loud first; only look at the answer after it
+        if "<think>" in content:
+            if "</think>" not in content:
+                return None
+            content = content.rsplit("</think>", 1)[1]
+
+        if expected == 1:
+            match = re.search(r'"score"\s*:\s*(\d+(?:\.\d+)?)\s*[,}]', content)
+            if not match:
+                return None
+            label = re.search(r'"label"\s*:\s*"([^"]*)"', content)
+            return {
+                "score": int(float(match.group(1))),
+                "rationale": "Early verdict (stream stopped after the score)",
+                "label": label.group(1) if label else None,
+                "_meta_early": True,
+            }
+
+        verdicts = []
+        for obj in re.findall(r'\{[^{}]*\}', content):
+            try:
+                verdict = json.loads(obj)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(verdict, dict) and "score" in verdict:
+                verdicts.append(verdict)
+        if len(verdicts) < expected:
             return None
+        return {"verdicts": verdicts, "_meta_early": True}
+
+    def parse_content(self, content):
+        """Model reply text -> JSON (object or array), with a regex fallback for chatty models."""
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            # Fallback extraction
+            match = re.search(r'\{.*\}', content, re.DOTALL)
+            if match:
+                try:
+                    return json.loads(match.group(0))
+                except:
+                    return {"score": 50, "rationale": "JSON Parse Failed", "label": "Unknown"}
+            return {"score": 50, "rationale": "Raw Parse Failed", "label": "Unknown"}
+
+    def sanitize_score(self, result):
+        """SANITIZE SCORE: Ensure result["score"] is an integer."""
+        if "score" in result:
+            val = result["score"]
+            if isinstance(val, str):
+                # Handle ranges like "81-100" -> take max to be safe/conservative
+                # Find all numbers
+                nums = re.findall(r'\d+', val)
+                if nums:
+                    # Take the average or max? 
+                    # Safety-critical: Max is safer (treat as wall if unsure)
+                    # But average is more representative. 
+                    # Let's take the first number found to keep it simple, or max.
+                    # "81-100" -> 100 (Wall). "10-20" -> 20.
+                    ints = [int(n) for n in nums]
+                    result["score"] = max(ints)
+                else:
+                    result["score"] = 50 # Default if no numbers found
+            elif isinstance(val, (int, float)):
+                result["score"] = int(val)
+            else:
+                result["score"] = 50
 
 # Test için (sadece bu dosya çalıştırılırsa)
 if __name__ == "__main__":
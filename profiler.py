@@ -0,0 +1,101 @@
+import functools
+import json
+import time
+
+PROFILE_ENABLED = False
+PROFILE_PATH = "profile.json"
+PROFILE_ALPHA = 0.1 # EWMA weight of the latest frame in the per-frame figures
+
+
+class Profiler:
+    """
+    Per-subsystem timers and counters for the hot path.
+
+    add_time(name, seconds) accumulates a timer (calls, total, max),
+    count(name, n) a counter. Both return right away while enabled is False,
+    so the instrumentation can stay in place; profiled() wraps a method with
+    a timer. end_frame() folds what the frame spent into per-frame EWMAs
+    (ms per frame for timers, amount per frame for counters) for the HUD.
+    Timers are inclusive: a timed call made inside another one counts in both.
+    """
+
+    def __init__(self, enabled=PROFILE_ENABLED):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.timers = {}        # name -> [calls, total s, max s]
+        self.counters = {}      # name -> total
+        self.frame_time = {}    # name -> s spent this frame
+        self.frame_counts = {}  # name -> amount this frame
+        self.frame_ms = {}      # name -> ms per frame (EWMA)
+        self.frame_rate = {}    # name -> counter amount per frame (EWMA)
+        self.frames = 0
+
+    def add_time(self, name, seconds):
+        if not self.enabled:
+            return
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+        if seconds > timer[2]:
+            timer[2] = seconds
+        self.frame_time[name] = self.frame_time.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+        self.frame_counts[name] = self.frame_counts.get(name, 0) + n
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frames += 1
+        for totals, ewma, scale in ((self.frame_time, self.frame_ms, 1000.0), (self.frame_counts, self.frame_rate, 1)):
+            for name in set(totals) | set(ewma):
+                value = totals.get(name, 0) * scale
+                ewma[name] = ewma.get(name, value) + PROFILE_ALPHA * (value - ewma.get(name, value))
+            totals.clear()
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.reset()
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "timers": {name: {"calls": calls, "total_ms": total * 1000, "mean_ms": total * 1000 / calls,
+                              "max_ms": peak * 1000}
+                       for name, (calls, total, peak) in sorted(self.timers.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def dump(self, path=PROFILE_PATH, **extra):
+        """Writes snapshot() (plus extra fields, e.g. the mission summary) as JSON."""
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(dict(self.snapshot(), **extra), f, indent=2)
+            print(f"[PROFILE] Written to {path}")
+        except OSError as e:
+            print(f"[PROFILE] Could not write {path}: {e}")
+
+
+def profiled(name):
+    """Method decorator: times every call into self.profiler under name (one attribute check when disabled)."""
+    def decorate(method):
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                profiler.add_time(name, time.perf_counter() - started)
+        return timed
+    return decorate
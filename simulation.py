@@ -0,0 +1,1310 @@
+import heapq
+import random
+import threading
+import time
+from ollama import OllamaAnalyzer
+from dstar_lite import DStarLitePlanner
+from hpa_star import HPAStarPlanner
+from ara_star import AnytimeAStarPlanner
+import numpy as np
+from grid import GridMap, INF, HIDDEN, manhattan_distance_transform
+from llm_dispatch import LLMDispatcher
+from decision_store import DecisionStore
+from telemetry import TelemetrySink
+from profiler import Profiler, profiled, PROFILE_ENABLED, PROFILE_PATH
+from visibility import FieldOfView
+from obstacle_catalog import ObstacleCatalog
+from fake_analyzer import FakeAnalyzer
+from local_scorer import LocalScorer, LOCAL_ACCEPT_CONFIDENCE, LOCAL_PROVISIONAL_CONFIDENCE
+
+# --- AYARLAR (CONSTANTS) ---
+MAP_WIDTH = 80
+MAP_HEIGHT = 60
+TICK_RATE = 60  # Logic ticks per simulated second (headless default)
+BLOCKS_PER_SECOND = 5.0 # Target speed
+SENSOR_RANGE = 4 # Manhattan radius of the sensor diamond (sunumda daha iyi görünsün diye 3 yerine 4)
+LLM_MODEL_CONCURRENCY = 1 # Requests in flight per model; more would only queue inside Ollama, out of priority order
+
+# Hedged close-range requests (a 2nd Cluster A model races the 1st, first valid verdict wins):
+# None   -> off
+# "p90"  -> hedge once the request runs longer than its model's p90 latency
+# "both" -> send to both Cluster A models right away
+LLM_HEDGE_MODES = [None, "p90", "both"]
+LLM_HEDGE_MODE = "p90"
+
+# LLM Batching: unknowns found within the window go out as ONE request per cluster
+LLM_BATCH_WINDOW_CLOSE = 0.0    # s, Cluster A flushes at the end of the tick that found them
+LLM_BATCH_WINDOW_DISTANT = 0.5  # s, Cluster B can afford to wait for more obstacles
+LLM_BATCH_MAX = 4               # Obstacles per request
+
+# Local fast path (local_scorer.py): unknowns similar enough to a scored obstacle skip the LLM,
+# weaker matches give a provisional score the planner uses until the LLM verdict arrives
+LOCAL_SCORER_ENABLED = True
+LOCAL_SAFETY_MARGIN = 20 # A provisional score only opens the cell if score + margin is still not a wall
+
+# Planner modes:
+# "astar"      -> find_path_astar from scratch on every replan
+# "dstar_lite" -> incremental D* Lite, only repairs cells changed since last replan
+# "hpa"        -> hierarchical A* over cluster entrances, only rebuilds clusters with changed cells (big maps)
+# "anytime"    -> ARA*: a quick inflated path first, refined across frames within a per-frame budget
+PLANNER_MODES = ["astar", "dstar_lite", "hpa", "anytime"]
+PLANNER_MODE = "dstar_lite"
+PLANNER_FRAME_BUDGET = 0.004      # s of anytime search per frame
+PLANNER_FRAME_EXPANSIONS = None   # ... or a fixed expansion count per frame (deterministic headless runs)
+MAX_MOVE_DT = 0.1                 # s, a stalled frame moves the car at most this much (no burst of steps)
+
+# Fleet: robots share the known map, obstacle verdicts and the LLM queue
+FLEET_SIZE = 1
+FLEET_SPACING = 6   # Rows / columns between neighbouring robots' starts (and goals)
+FLEET_MAX_WAIT = 3  # Steps a robot yields to another one in its next cell before planning around it
+
+# Replan causes, most important first (a coalesced replan is reported under the first one requested)
+REPLAN_CAUSES = ["initial", "collision", "blocked", "detour", "sensor", "verdict", "anytime"]
+FORCED_REPLAN_CAUSES = {"anytime"} # Replanned even if no changed cell touches the path
+
+# Map kodları (bkz. grid.py):
+# real_map: 0 boş, 1 sabit duvar, 2 gizli engel (ground truth)
+# known_map: 0 bilinmiyor/boş sanıyor, 1 bilinen engel (duvar veya keşfedilen)
+# cost_map: planner maliyeti (known_map + semantik skor), INF = geçilmez
+
+class Robot:
+    """Mission state of one robot of the fleet (position, path, planner, speed, stats)."""
+
+    def __init__(self, index, start_pos, end_pos):
+        self.index = index
+        self.start_pos = start_pos
+        self.end_pos = end_pos
+        self.car_pos = start_pos
+        self.path = []
+        self.path_version = 0   # Bumped whenever recalculate_path replaces self.path
+        self.path_index = None  # Manhattan distance to the remaining path, per cell
+        self.path_index_key = None
+        self.planner = None
+        self.pending_cell_changes = set() # Cells whose cost changed since this robot's last replan
+        self.replan_causes = set()        # Why a replan was requested since the last one (replan_if_needed)
+        self.cheaper_cells = set()        # Cells whose cost went down / up since the last replan
+        self.costlier_cells = set()
+        self.blocked_cells = set()        # ... became INF since the last replan_if_needed
+        self.fov = None # FieldOfView, rebuilt with the grid
+        self.speed_modifier = 0.0
+        self.move_accumulator = 0.0
+        self.waited = 0 # Consecutive steps spent yielding to another robot
+        self.goal_reached = False
+
+        # Stats
+        self.steps = 0
+        self.replans = 0
+        self.expansions = 0
+        self.yields = 0
+
+    def reset(self):
+        self.car_pos = self.start_pos
+        self.path = []
+        self.move_accumulator = 0.0
+        self.replan_causes = set()
+        self.cheaper_cells = set()
+        self.costlier_cells = set()
+        self.blocked_cells = set()
+        self.waited = 0
+        self.goal_reached = False
+        self.steps = 0
+        self.replans = 0
+        self.expansions = 0
+        self.yields = 0
+
+
+def robot_attr(name):
+    """Class attribute forwarding name to the robot being processed (RobotSimulation.robot)."""
+    return property(lambda self: getattr(self.robot, name),
+                    lambda self, value: setattr(self.robot, name, value))
+
+
+class RobotSimulation:
+    """
+    Mission logic (maps, sensors, planner, LLM routing, movement) with no pygame
+    dependency. Time is simulated: every tick(dt) advances sim_time by dt, so the
+    same engine runs in real time under PathfindingVisualizer or as fast as the
+    CPU allows via run_headless().
+
+    Fleet mode (fleet_size > 1): the robots share the grid, obstacle props,
+    decision cache and the LLM dispatcher; each has its own Robot state. The
+    per-robot fields below (car_pos, path, planner, ...) read and write the
+    robot being processed, self.robot, so sensing, planning and movement code
+    is written for one robot and tick() runs it for each of them.
+    """
+
+    car_pos = robot_attr("car_pos")
+    start_pos = robot_attr("start_pos")
+    end_pos = robot_attr("end_pos")
+    path = robot_attr("path")
+    path_version = robot_attr("path_version")
+    path_index = robot_attr("path_index")
+    path_index_key = robot_attr("path_index_key")
+    planner = robot_attr("planner")
+    pending_cell_changes = robot_attr("pending_cell_changes")
+    fov = robot_attr("fov")
+    speed_modifier = robot_attr("speed_modifier")
+    move_accumulator = robot_attr("move_accumulator")
+    steps = robot_attr("steps")
+    replans = robot_attr("replans")
+    expansions = robot_attr("expansions")
+
+    def __init__(self, analyzer=None, width=MAP_WIDTH, height=MAP_HEIGHT, warmup=True,
+                 seed=None, planner_mode=PLANNER_MODE, telemetry=None, decision_store=None,
+                 sensor_range=SENSOR_RANGE, hedge_mode=LLM_HEDGE_MODE, local_scorer=LOCAL_SCORER_ENABLED,
+                 planner_budget=PLANNER_FRAME_BUDGET, planner_expansions=PLANNER_FRAME_EXPANSIONS,
+                 fleet_size=FLEET_SIZE, profile=PROFILE_ENABLED):
+        self.width = width
+        self.height = height
+        self.sensor_range = sensor_range
+        slots = self.fleet_slots()
+        if fleet_size > len(slots):
+            print(f"[FLEET] A {width}x{height} map fits {len(slots)} robots; fleet size clamped from {fleet_size}")
+            fleet_size = len(slots)
+        self.robots = [Robot(i, *slots[i]) for i in range(fleet_size)]
+        self.robot = self.robots[0] # Robot being processed (HUD / single-robot callers see the first one)
+        self.profiler = Profiler(profile) # Subsystem timers / counters, dumped to PROFILE_PATH at mission end
+
+        # Seeded RNG for obstacle placement / properties (None = unseeded)
+        self.rng = random.Random(seed)
+        self.telemetry = telemetry # Optional TelemetrySink (None = no records, e.g. benchmarks)
+        self.hedge_mode = hedge_mode
+
+        # LLM Integration
+        self.analyzer = analyzer if analyzer is not None else OllamaAnalyzer()
+        # Stand-in backends (fake_analyzer.py) answer synchronously on the simulated clock
+        self.simulated_llm = getattr(self.analyzer, "simulated", False)
+        # Scheduler: most urgent obstacle (time-to-contact) first, per-model slots,
+        # lowest latency EWMA wins, models with an open circuit breaker are skipped
+        model_limits = {m: LLM_MODEL_CONCURRENCY for m in self.analyzer.models}
+        model_rank = lambda m: self.analyzer.latency[m].ewma
+        if self.simulated_llm:
+            self.analyzer.clock = lambda: self.sim_time
+            self.llm_dispatcher = LLMDispatcher(model_limits, inline_clock=lambda: self.sim_time,
+                                                model_rank=model_rank, model_available=self.analyzer.is_available)
+        else:
+            self.llm_dispatcher = LLMDispatcher(model_limits, model_rank=model_rank,
+                                                model_available=self.analyzer.is_available)
+        
+        # Pending LLM requests, one item per obstacle; items sent together share a dispatcher job
+        self.llm_queue = []  # List of {start_time, props, pos, distant_mode, job}
+        # Obstacles waiting to be batched, per cluster (key: distant_mode)
+        self.llm_batches = {mode: {"entries": [], "opened": 0.0} for mode in (False, True)}
+        self.is_warming_up = warmup # Robots stand still (speed_modifier 0.0) until the warmup finishes
+        self.warmup_thread = None
+
+        # Simulated Clock (seconds)
+        self.sim_time = 0.0
+        self.game_start_time = 0.0
+        self.mission_complete = False
+
+        self.grid = None
+        self.real_map = None
+        self.known_map = None
+        self.cost_map = None
+        
+        # Karar Önbellekleme (Decision Caching)
+        self.decision_cache = {} # type_name -> score
+        self.catalog = ObstacleCatalog(self.OBSTACLE_TEMPLATES, self.KNOWN_SCORES) # Type ids, score/cost/color per id
+        self.cache_hit_count = 0
+        self.decision_store = decision_store # Optional DecisionStore shared across missions
+        self.processed_cache_ids = set()
+
+        # Local nearest-neighbour scorer, seeded with the knowledge base and fed every LLM verdict
+        self.local_scorer = LocalScorer(
+            (t, self.KNOWN_SCORES[t["type"]]) for t in self.OBSTACLE_TEMPLATES if t["type"] in self.KNOWN_SCORES
+        ) if local_scorer else None
+        self.local_hit_count = 0         # Unknowns scored locally, no LLM call
+        self.provisional_count = 0       # Unknowns opened to the planner on a provisional local score
+
+        # Planner State
+        self.planner_mode = planner_mode
+        self.planner_budget = planner_budget         # "anytime" mode only
+        self.planner_expansions = planner_expansions
+        self.dirty_cells = set() # Cells whose known/props state changed since the visualizer last drew them
+
+        # İstatistikler (sunumda çok iyi durur)
+        # (steps / replans / expansions - planner node expansions - are per robot, see Robot)
+        self.discovered_obstacles = 0
+        self.llm_call_count = 0
+        self.llm_dedup_count = 0 # Unknowns not sent because the same obstacle type was already being analyzed
+
+        self.initialize_game()
+
+        # Warmup (Now Non-Blocking / Threaded)
+        if warmup:
+            self.warmup_llm()
+        else:
+            for robot in self.robots:
+                robot.speed_modifier = 1.0
+
+    def warmup_llm(self):
+        """Starts the warmup process in a background thread."""
+        def _warmup_task():
+            print("------------------------------------------------")
+            print("[SYSTEM] Warming up Multi-Model Cluster... (Background)")
+            print("------------------------------------------------")
+            dummy_prop = {"id": "warmup", "type": "warmup_pixel", "visual": "loading", "physics": "none"}
+            
+            for model in self.analyzer.models:
+                print(f"   -> Warming up {model}...")
+                try:
+                    # Model load time is not representative, keep it out of the latency stats
+                    self.analyzer.analyze_obstacle(dummy_prop, forced_model=model, record_latency=False)
+                except:
+                    pass
+            
+            print("[SYSTEM] Cluster Warmup Complete. Enabling Engines.")
+            print("------------------------------------------------")
+            self.is_warming_up = False # Signal completion
+            for robot in self.robots:
+                robot.speed_modifier = 1.0 # Auto-start
+
+        self.warmup_thread = threading.Thread(target=_warmup_task)
+        self.warmup_thread.daemon = True
+        self.warmup_thread.start()
+
+    def initialize_game(self):
+        self.grid = GridMap(self.width, self.height)
+        self.real_map = self.grid.real
+        self.known_map = self.grid.known
+        self.cost_map = self.grid.cost
+        
+        # Keşfedilen engellerin özellikleri (x, y) -> { "color": ... }
+        self.obstacle_props = {} 
+        self.type_cells = {} # type_id -> [(x, y)] of discovered obstacles (verdict propagation)
+
+        for robot in self.robots:
+            robot.reset()
+        self.discovered_obstacles = 0
+        self.replans_by_cause = {}
+        self.replans_skipped = 0 # Requests dropped because no changed cell could improve the path
+        endpoints = [r.start_pos for r in self.robots] + [r.end_pos for r in self.robots]
+
+        # Sabit duvarlar (bilinen); large fleets may start inside one, those cells stay open
+        self.add_wall_line((20, 0), (20, 40), endpoints)
+        self.add_wall_line((50, 20), (50, 59), endpoints)
+        self.add_wall_line((20, 40), (40, 40), endpoints)
+
+        # Rastgele gizli engeller (real_map'te var, known_map'te yok)
+        print("Rastgele gizli engeller oluşturuluyor...")
+        for _ in range(600): # Increased from 300 to 600
+            rx = self.rng.randint(0, self.width - 1)
+            ry = self.rng.randint(0, self.height - 1)
+
+            # Başlangıç ve bitişi kapatma (her robot için)
+            if all(self.heuristic((rx, ry), p) > 5 for p in endpoints) and \
+               self.real_map[rx, ry] == 0:
+                self.grid.set_real(rx, ry, HIDDEN)
+
+        self.dirty_cells = set() # New grid, observers redraw everything
+        self.mission_complete = False
+        for robot in self.robots:
+            self.robot = robot
+            self.fov = FieldOfView(self.grid, self.sensor_range)
+            self.reset_planner()
+            self.recalculate_path("initial")
+        self.robot = self.robots[0]
+        self.game_start_time = self.sim_time
+
+    def fleet_slots(self):
+        """
+        (start, goal) per robot, in robot order: the first one goes corner to corner,
+        the next ones are stacked FLEET_SPACING rows apart down the left edge (goals
+        mirrored on the right), then the same one column of FLEET_SPACING further in.
+        Only slots whose start lies before its goal on both axes fit the map.
+        """
+        rows = (self.height - 6) // (2 * FLEET_SPACING) + 1
+        cols = (self.width - 6) // (2 * FLEET_SPACING) + 1
+        slots = []
+        for col in range(cols):
+            for row in range(rows):
+                dx, dy = col * FLEET_SPACING, row * FLEET_SPACING
+                slots.append(((2 + dx, 2 + dy), (self.width - 3 - dx, self.height - 3 - dy)))
+        goals = {goal for _, goal in slots}
+        return [slot for slot in slots if slot[0] not in goals]
+
+    def active_robots(self):
+        return [robot for robot in self.robots if not robot.goal_reached]
+
+    def add_wall_line(self, start, end, keep_clear=()):
+        x1, y1 = start
+        x2, y2 = end
+
+        if x1 == x2:  # Dikey
+            for y in range(min(y1, y2), max(y1, y2) + 1):
+                if 0 <= x1 < self.width and 0 <= y < self.height and (x1, y) not in keep_clear:
+                    self.grid.set_wall(x1, y)
+        elif y1 == y2:  # Yatay
+            for x in range(min(x1, x2), max(x1, x2) + 1):
+                if 0 <= x < self.width and 0 <= y1 < self.height and (x, y1) not in keep_clear:
+                    self.grid.set_wall(x, y1)
+
+    def heuristic(self, a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def cell_cost(self, x, y):
+        """Cost of entering (x, y) according to what the robot knows. INF = blocked."""
+        return self.cost_map.item(x, y)
+
+    def mark_cell_changed(self, x, y):
+        """
+        Must be called after known_map / obstacle_props change at (x, y):
+        re-syncs cost_map and records the cell for the incremental planner and the renderer.
+        """
+        props = self.obstacle_props.get((x, y))
+        old_cost = self.cost_map.item(x, y)
+        self.grid.refresh_cost(x, y, props.get("score", 0) if props is not None else None)
+        new_cost = self.cost_map.item(x, y)
+        for robot in self.robots:
+            robot.pending_cell_changes.add((x, y))
+            if new_cost < old_cost:
+                robot.cheaper_cells.add((x, y))
+            elif new_cost > old_cost:
+                robot.costlier_cells.add((x, y))
+                if new_cost == INF:
+                    robot.blocked_cells.add((x, y))
+        self.dirty_cells.add((x, y))
+
+    def reset_planner(self):
+        """(Re)creates the planner for the current mode; needed when the map or goal is rebuilt."""
+        self.pending_cell_changes = set()
+        if self.planner_mode == "dstar_lite":
+            self.planner = DStarLitePlanner(self.width, self.height, self.end_pos, self.cell_cost)
+        elif self.planner_mode == "hpa":
+            self.planner = HPAStarPlanner(self.width, self.height, self.end_pos, self.cell_cost)
+        elif self.planner_mode == "anytime":
+            self.planner = AnytimeAStarPlanner(self.width, self.height, self.end_pos, self.cell_cost,
+                                               frame_budget=self.planner_budget,
+                                               frame_expansions=self.planner_expansions)
+        else:
+            self.planner = None
+
+    def cycle_planner_mode(self):
+        idx = PLANNER_MODES.index(self.planner_mode)
+        self.planner_mode = PLANNER_MODES[(idx + 1) % len(PLANNER_MODES)]
+        print(f"[PLANNER] Switched to {self.planner_mode}")
+        active = self.robot
+        for robot in self.robots:
+            self.robot = robot
+            self.reset_planner()
+            self.recalculate_path("initial")
+        self.robot = active
+
+    @profiled("astar")
+    def find_path_astar(self):
+        start = self.car_pos
+        end = self.end_pos
+
+        queue = [(0, start)]
+        g_score = {start: 0}
+        came_from = {start: None}
+
+        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+        cost_map = self.cost_map
+
+        while queue:
+            current_f, current = heapq.heappop(queue)
+            self.expansions += 1
+
+            if current == end:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = came_from[current]
+                return path[::-1]
+
+            cx, cy = current
+
+            for dx, dy in directions:
+                nx, ny = cx + dx, cy + dy
+
+                if 0 <= nx < self.width and 0 <= ny < self.height:
+                    # Engel + semantik maliyet (sadece known_map'e göre!)
+                    cell_cost = cost_map.item(nx, ny)
+                    if cell_cost == INF:
+                        continue
+                    
+                    # Eğer LLM henüz cevap vermediyse ve cache'de yoksa, 
+                    # araba burayı geçici olarak "duvar" (riskli) görebilir.
+                    # Ancak biz şimdilik sadece 'bilinen' skorları uyguluyoruz.
+
+                    new_g = g_score[current] + cell_cost
+                    if new_g < g_score.get((nx, ny), float("inf")):
+                        came_from[(nx, ny)] = current
+                        g_score[(nx, ny)] = new_g
+                        f_score = new_g + self.heuristic((nx, ny), end)
+                        heapq.heappush(queue, (f_score, (nx, ny)))
+
+        return []
+
+    @profiled("replan")
+    def recalculate_path(self, cause):
+        """
+        Replans from the car. cause says why (counted per cause by the profiler): initial,
+        sensor, verdict, collision, blocked (another robot's discovery), detour (around
+        another robot) or anytime.
+        """
+        expansions_before = self.expansions
+        robot = self.robot
+        robot.replan_causes, robot.cheaper_cells, robot.costlier_cells = set(), set(), set()
+        if self.planner is not None:
+            changed = self.pending_cell_changes
+            self.pending_cell_changes = set()
+            expanded_before = self.planner.expansions
+            path = self.planner.plan(self.car_pos, changed)
+            self.expansions += self.planner.expansions - expanded_before
+            if path is None:
+                # Anytime search out of budget before its first path: keep the old one while it is open
+                path = self.path if self.path_is_open() else []
+            self.path = path
+        else:
+            self.pending_cell_changes.clear()
+            self.path = self.find_path_astar()
+        self.path_version += 1
+        if cause != "initial":
+            self.replans += 1
+            self.replans_by_cause[cause] = self.replans_by_cause.get(cause, 0) + 1
+        self.profiler.count("expansions", self.expansions - expansions_before)
+        self.profiler.count(f"replan:{cause}")
+        self.record("replan", robot=self.robot.index, planner=self.planner_mode, cause=cause,
+                    path_len=len(self.path), expansions=self.expansions)
+        if not self.path:
+            print("Yol tıkandı veya bulunamadı!")
+
+    def path_is_open(self):
+        """True if the current path starts at the car and none of its cells became blocked."""
+        return bool(self.path) and self.path[0] == self.car_pos and \
+            all(self.cost_map.item(x, y) != INF for x, y in self.path[1:])
+
+    def planning_in_progress(self):
+        """True while the anytime planner is still looking for (or refining) a path."""
+        return self.planner_mode == "anytime" and not self.planner.finished
+
+    @profiled("plan_improve")
+    def improve_path(self):
+        """Anytime mode: spends what is left of the frame budget on a better path."""
+        planner = self.planner
+        if not self.planning_in_progress():
+            return
+        solutions, expanded_before = planner.solutions, planner.expansions
+        path = planner.improve()
+        self.expansions += planner.expansions - expanded_before
+        self.profiler.count("expansions", planner.expansions - expanded_before)
+        if planner.solutions == solutions:
+            return
+
+        if self.car_pos in path:
+            self.path = path[path.index(self.car_pos):]
+        elif path:
+            # The car already left the search's start behind and is not on the new path
+            self.request_replan("anytime")
+            return
+        else:
+            self.path = []
+        self.path_version += 1
+
+    def path_distance(self, x, y):
+        """
+        Manhattan distance from (x, y) to the nearest cell of the remaining path (INF if there is none).
+        Backed by a distance transform that is rebuilt lazily, only after the path changed
+        (replan, or a step consumed its first cell), so each query is a single array read.
+        """
+        if not self.path:
+            return INF
+        key = (self.path_version, len(self.path))
+        if self.path_index_key != key:
+            mask = np.zeros((self.width, self.height), dtype=bool)
+            xs, ys = zip(*self.path)
+            mask[list(xs), list(ys)] = True
+            self.path_index = manhattan_distance_transform(mask)
+            self.path_index_key = key
+        return self.path_index.item(x, y)
+
+    def has_line_of_sight(self, start, end):
+        """Bresenham's Line Algorithm ile görüş hattı kontrolü."""
+        self.profiler.count("los_rays")
+        x0, y0 = start
+        x1, y1 = end
+        
+        dx = abs(x1 - x0)
+        dy = abs(y1 - y0)
+        x, y = x0, y0
+        
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        
+        err = dx - dy
+        
+        while True:
+            # Başlangıç ve bitiş noktası hariç ara noktalara bak
+            if (x, y) != start and (x, y) != end:
+                # Harita sınırları kontrolü (teorik olarak gerekmez ama güvenli)
+                if 0 <= x < self.width and 0 <= y < self.height:
+                    # Engel varsa (Duvar=1 veya Gizli=2) görüşü engeller
+                    if self.real_map[x, y] != 0:
+                        return False
+            
+            if (x, y) == end:
+                return True
+                
+            e2 = 2 * err
+            if e2 > -dy:
+                err -= dy
+                x += sx
+            if e2 < dx:
+                err += dx
+                y += sy
+
+    """
+    Obstacle Templates
+    """
+    OBSTACLE_TEMPLATES = [
+        # SAFE (< 50)
+        {"type": "dry_grass", "visual": "yellow dried grass", "physics": "soft, easy to traverse"},
+        {"type": "dirt_path", "visual": "packed dirt trail", "physics": "solid, high friction"},
+        {"type": "asphalt", "visual": "grey cracked pavement", "physics": "hard, excellent grip"},
+        {"type": "gravel", "visual": "small loose stones", "physics": "noisy but traversable"},
+        {"type": "flowers", "visual": "patch of wildflowers", "physics": "soft, negligible resistance"},
+        
+        # CAUTION (50 - 80)
+        {"type": "puddle", "visual": "reflective liquid surface, looks shallow", "physics": "liquid, low friction"},
+        {"type": "mud_patch", "visual": "brown sticky surface, rough texture", "physics": "viscous, high resistance"},
+        {"type": "shallow_water", "visual": "clear water, seeing bottom", "physics": "liquid, drag"},
+        {"type": "sand_dune", "visual": "pile of soft sand", "physics": "shifting, risk of getting stuck"},
+        {"type": "ice_patch", "visual": "glossy white surface", "physics": "extremely slippery, zero friction"},
+        {"type": "rubble", "visual": "pile of broken bricks", "physics": "uneven, sharp edges"},
+
+        # DANGER (> 80)
+        {"type": "big_rock", "visual": "large grey solid object", "physics": "solid, immovable"},
+        {"type": "fire_pit", "visual": "burning wood, smoke", "physics": "hot, dangerous"},
+        {"type": "thick_swamp", "visual": "deep muddy water with vegetation", "physics": "very viscous, high sinking risk"},
+        {"type": "deep_pit", "visual": "dark hole with no visible bottom", "physics": "empty space, fall risk"},
+        {"type": "lava", "visual": "glowing molten rock", "physics": "deadly heat, instant destruction"},
+        {"type": "concrete_wall", "visual": "solid reinforced concrete", "physics": "immovable wall"},
+        {"type": "radioactive_waste", "visual": "glowing green goo", "physics": "toxic, corrosive"},
+        {"type": "spike_trap", "visual": "sharp metal spikes", "physics": "puncture risk"},
+
+        # MYSTERY (Unknowns - Not in KNOWN_SCORES)
+        {"type": "mystery_box", "visual": "floating question mark box", "physics": "unknown"},
+        {"type": "alien_monolith", "visual": "smooth black metal slab", "physics": "humming vibration"},
+        {"type": "glitch_trap", "visual": "flickering pixels", "physics": "distorted reality"},
+        {"type": "magnetic_field", "visual": "distorted air with blue sparks", "physics": "electronic interference"},
+        {"type": "robot_scrap", "visual": "pile of rusted circuits and gears", "physics": "sharp metal debris"},
+        {"type": "oil_slick", "visual": "shimmering oily pool", "physics": "extremely low friction"},
+        {"type": "toxic_gas", "visual": "greenish-yellow haze", "physics": "corrosive atmosphere"},
+        # ... unknown variants of known terrain (the local scorer resolves these without the LLM)
+        {"type": "lava_crust", "visual": "glowing molten rock under a thin crust", "physics": "deadly heat, instant destruction"},
+        {"type": "wet_gravel", "visual": "small loose wet stones", "physics": "noisy but traversable"},
+        {"type": "cracked_asphalt", "visual": "grey cracked pavement with potholes", "physics": "hard, good grip"},
+    ]
+
+    # Pre-defined Knowledge Base (Type -> Score)
+    KNOWN_SCORES = {
+        # Safe
+        "dry_grass": 10, "dirt_path": 5, "asphalt": 0, "gravel": 15, "flowers": 5,
+        # Caution
+        "puddle": 40, "mud_patch": 60, "shallow_water": 50, "sand_dune": 65, "ice_patch": 70, "rubble": 55,
+        # Danger
+        "big_rock": 100, "fire_pit": 100, "thick_swamp": 90, "deep_pit": 100, 
+        "lava": 100, "concrete_wall": 100, "radioactive_waste": 100, "spike_trap": 100 # Walls
+    }
+
+    def generate_obstacle_properties(self):
+        """Sonradan eklenen engellere rastgele özellik atar."""
+        catalog = self.catalog
+
+        # 30% Chance for Unknown (Mystery) Object -> 70% Known
+        if self.rng.random() < 0.3 and catalog.unknown_ids:
+            type_id = self.rng.choice(catalog.unknown_ids)
+        else:
+            type_id = self.rng.choice(catalog.known_ids)
+
+        # Unique copy; color from the score if known (instant feedback), purple "Mystery" if not.
+        # Unknowns get no score yet.
+        props = catalog.instantiate(type_id)
+
+        # ID generation
+        props["id"] = f"obj_{self.rng.randint(1000, 9999)}"
+        return props
+
+    def treat_as_wall(self, props):
+        """Returns True if the obstacle is considered a wall (score > 80)."""
+        # Resolved (knowledge base or cached verdict) scores live in the catalogue
+        score = self.catalog.score(props["type_id"])
+        return score is not None and score > 80
+
+    def cache_verdict(self, props, score):
+        """Records the score of props' type in decision_cache and the catalogue lookup arrays."""
+        self.decision_cache[props["type"]] = score
+        self.catalog.set_score(props["type_id"], score)
+
+    def load_persisted_verdict(self, props):
+        """Fills decision_cache from the on-disk store if an earlier mission already analyzed this obstacle."""
+        if self.decision_store is None:
+            return
+        score = self.decision_store.lookup(props, self.analyzer.prompt_version)
+        if score is not None:
+            self.cache_verdict(props, score)
+            if self.local_scorer is not None:
+                self.local_scorer.learn(props, score)
+            print(f"[CACHE] Loaded {props['type']} -> {score} from decision store")
+
+    def estimate_locally(self, props):
+        """(score, confidence, nearest_type) from the local scorer, or None if it is off or has no match."""
+        if self.local_scorer is None:
+            return None
+        return self.local_scorer.estimate(props)
+
+    def queue_for_llm(self, props, pos, distant_mode):
+        """Adds an unknown obstacle to its cluster's batch; flush_llm_batches sends it."""
+        batch = self.llm_batches[distant_mode]
+        if not batch["entries"]:
+            batch["opened"] = self.sim_time
+        batch["entries"].append((props, pos, self.robot.index))
+
+    @profiled("llm_flush")
+    def flush_llm_batches(self):
+        """
+        Sends each cluster's batch once its window has elapsed or it is full.
+        A saturated fleet is the scheduler's problem: the request waits there in priority order.
+        """
+        for distant_mode in (False, True):
+            batch = self.llm_batches[distant_mode]
+            entries = batch["entries"]
+            if not entries:
+                continue
+
+            window = LLM_BATCH_WINDOW_DISTANT if distant_mode else LLM_BATCH_WINDOW_CLOSE
+            if len(entries) < LLM_BATCH_MAX and self.sim_time - batch["opened"] < window:
+                continue
+
+            batch["entries"] = entries[LLM_BATCH_MAX:]
+            batch["opened"] = self.sim_time
+            self.send_batch_to_llm(entries[:LLM_BATCH_MAX], distant_mode)
+
+    def send_to_llm(self, props, pos, distant_mode=False):
+        """Sends a single obstacle (for the robot being processed) right away (no batching window)."""
+        self.send_batch_to_llm([(props, pos, self.robot.index)], distant_mode)
+
+    def send_batch_to_llm(self, entries, distant_mode=False):
+        """Sends [(props, pos, robot_index), ...] to the fleet as one request through the dispatcher."""
+        ids = ", ".join(f"{props['id']} ({props['type']})" for props, _, _ in entries)
+        print(f"[LLM] Requesting analysis for {ids}...")
+        self.llm_call_count += 1
+        
+        # Context Injection: Add known examples to guide the model
+        context_examples = {k: v for k, v in list(self.KNOWN_SCORES.items())[:5]} # Pick first 5 as examples
+        props_list = [props for props, _, _ in entries]
+        
+        def request(cancel_event, model_id):
+            # Pass our simplified known list as context; the scheduler already picked the model
+            return self.analyzer.analyze_batch(props_list, context_examples, forced_model=model_id,
+                                               cancel_event=cancel_event)
+
+        job = {"items": [], "distant_mode": distant_mode}
+        for props, pos, robot_index in entries:
+            item = {
+                "start_time": self.sim_time,
+                "props": props,
+                "pos": pos,
+                "robot": robot_index, # The robot that found it (and slows down for it)
+                "distant_mode": distant_mode,
+                "job": job
+            }
+            job["items"].append(item)
+            self.llm_queue.append(item)
+
+        # Cluster B work may borrow idle Cluster A models (and is preempted there by close obstacles)
+        priority = min(self.time_to_contact(x, y) for _, (x, y), _ in entries)
+        self.record("llm_request", cluster="B" if distant_mode else "A", obstacles=[p["id"] for p in props_list],
+                    types=[p["type"] for p in props_list], priority=priority)
+        if distant_mode:
+            self.llm_dispatcher.submit(job, request, self.analyzer.cluster_b, priority, spill=self.analyzer.cluster_a)
+        else:
+            hedge_after = self.hedge_delay if self.hedge_mode else None
+            self.llm_dispatcher.submit(job, request, self.analyzer.cluster_a, priority, hedge_after=hedge_after)
+
+    def hedge_delay(self, model_id):
+        """Seconds a close-range request may run on model_id before it is hedged (None = not yet)."""
+        if self.hedge_mode == "both":
+            return 0.0
+        return self.analyzer.latency[model_id].percentile(90) # None until the model has samples
+
+    def time_to_contact(self, x, y):
+        """
+        Estimated seconds until a robot reaches (x, y): distance from the car plus the
+        detour off the path, at the current speed (obstacles on the path ahead come first).
+        In fleet mode the robot that gets there first counts.
+        """
+        processing = self.robot
+        best = INF
+        for robot in self.active_robots() or [processing]:
+            self.robot = robot
+            cx, cy = self.car_pos
+            distance = abs(x - cx) + abs(y - cy)
+            if self.path:
+                distance += self.path_distance(x, y)
+            speed = BLOCKS_PER_SECOND * max(self.speed_modifier, 0.1)
+            best = min(best, distance / speed)
+        self.robot = processing
+        return best
+
+    def cancel_llm_item(self, item):
+        """Drops one obstacle's pending verdict; the request itself is cancelled once none of its obstacles need it."""
+        item["cancelled"] = True
+        job = item["job"]
+        if all(i.get("cancelled") for i in job["items"]):
+            self.llm_dispatcher.cancel(job)
+
+    def is_llm_item_active(self, item):
+        return not item.get("cancelled") and self.llm_dispatcher.is_active(item["job"])
+
+    def resolve_unknown_obstacle(self, x, y, score):
+        """
+        Called when LLM (or cache) decides a score for a previously unknown object.
+        Only updates the cell; the replan is left to the caller (see request_replan).
+        """
+        # Update map based on verdict
+        if score > 80:
+             # It's a wall. Keep it as 1.
+             self.known_map[x, y] = 1
+             print(f"[RESOLVE] {x},{y} -> WALL (Score {score})")
+             self.mark_cell_changed(x, y)
+        else:
+             # It's safe/traversable. Remove wall marker.
+             self.known_map[x, y] = 0
+             print(f"[RESOLVE] {x},{y} -> SAFE/TRAVERSABLE (Score {score})")
+             self.mark_cell_changed(x, y)
+             
+             # Need to trigger pathfinding since a wall just opened up
+             self.request_replan("verdict", everyone=True)
+
+    def request_replan(self, cause, everyone=False):
+        """Marks the plan of the robot being processed (or of every robot) dirty; tick() coalesces the requests."""
+        for robot in (self.robots if everyone else [self.robot]):
+            robot.replan_causes.add(cause)
+
+    def replan_if_needed(self):
+        """
+        The (at most one) replan of this tick for the robot being processed. It runs if
+        a cell on the path became blocked, or if a replan was requested and a changed
+        cell can matter: a costlier cell on the path or a cheaper one off it. Cheaper
+        cells on the path and costlier ones off it never make another route better,
+        so such requests are dropped (replans_skipped). The changed cells are kept
+        until a replan runs, so a later request still sees every one of them.
+        """
+        robot = self.robot
+        causes, blocked = robot.replan_causes, robot.blocked_cells
+        if not causes and not blocked:
+            return
+        robot.blocked_cells = set()
+
+        on_path = set(self.path)
+        if blocked & on_path:
+            causes.add("blocked")
+        elif not causes:
+            return
+        elif not (causes & FORCED_REPLAN_CAUSES or robot.costlier_cells & on_path or robot.cheaper_cells - on_path):
+            robot.replan_causes = set()
+            self.replans_skipped += 1
+            return
+        self.recalculate_path(next(c for c in REPLAN_CAUSES if c in causes))
+
+    @profiled("priority_upgrades")
+    def check_priority_upgrades(self):
+        """
+        Scans the LLM queue for 'Distant' tasks (Cluster B) that have become 'Close' (< 2 blocks).
+        If found, they are removed from the Distant flow and re-submitted to Cluster A (Priority).
+        """
+        upgraded_indices = []
+        
+        for i, item in enumerate(self.llm_queue):
+            if not item["distant_mode"]:
+                continue # Already priority
+                
+            # Check current distance
+            ox, oy = item["pos"]
+            cx, cy = self.car_pos
+            
+            # --- Condition 1: VISIBILITY (Line of Sight) ---
+            # Don't upgrade if we can't see it (e.g. behind a wall now)
+            if not self.has_line_of_sight((cx, cy), (ox, oy)):
+                continue
+
+            # --- Condition 2: PROXIMITY TO PATH (Shortest Distance) ---
+            # Check distance to ANY point on the projected path, not just current pos
+            min_dist_to_path = min(abs(ox - cx) + abs(oy - cy), self.path_distance(ox, oy))
+            
+            # Threshold: If obstacle is within 2 blocks of our route
+            if min_dist_to_path < 2:
+                # UPGRADE NEEDED
+                print(f"[PRIORITY UPGRADE] Object {item['props']['id']} at ({ox},{oy}) intersects PATH (Dist {min_dist_to_path}) & VISIBLE!")
+                upgraded_indices.append(i)
+        
+        # Process upgrades (iterate backwards to avoid index shifting)
+        for i in sorted(upgraded_indices, reverse=True):
+            item = self.llm_queue.pop(i)
+            # Cancel the Cluster B request (its result is dropped) and re-submit to Cluster A
+            self.cancel_llm_item(item)
+            self.send_to_llm(item["props"], item["pos"], distant_mode=False)
+
+
+    @profiled("llm_results")
+    def process_llm_results(self):
+        """Applies the verdicts that arrived since the last frame (shared by the fleet); the replans wait for tick()."""
+        # 1. Process results from the dispatcher's completion queue
+        for job, results in self.llm_dispatcher.poll():
+            if results is None:
+                results = [None] * len(job["items"])
+            for item, result in zip(job["items"], results):
+                if not item.get("cancelled"):
+                    self.apply_llm_verdict(item, result)
+
+        self.llm_queue = [item for item in self.llm_queue if self.is_llm_item_active(item)]
+
+    def update_speed(self):
+        """Sets the speed of the robot being processed from the LLM work it waits for."""
+
+        # 0. PRIORITY: WARMUP
+        if self.is_warming_up:
+            self.speed_modifier = 0.0
+            return
+
+        # --- SPEED LOGIC ---
+        # Default to Full Speed
+        # Close obstacles still waiting in their batch count as pending Cluster A work
+        index = self.robot.index
+        should_slow_down = any(entry[2] == index for entry in self.llm_batches[False]["entries"])
+
+        for item in self.llm_queue:
+            # If ANY of our items uses 'Close' mode (distant_mode=False), we MUST slow down.
+            if not item["distant_mode"] and item["robot"] == index:
+                should_slow_down = True
+
+        if should_slow_down:
+             self.speed_modifier = 0.1 # SLOW CRAWL (0.1x) for Priority items
+        else:
+             self.speed_modifier = 1.0 # FULL SPEED if only Distant items (or nothing) are pending
+
+    def apply_llm_verdict(self, item, result):
+        """Applies one obstacle's LLM verdict: cache, log, update every instance of the type, replan."""
+        res_props, was_distant = item["props"], item["distant_mode"]
+
+        if result and "score" in result:
+            res_score = result["score"]
+            used_model = result.get("_meta_model", "unknown")
+            cluster_name = "Cluster B" if was_distant else "Cluster A"
+            
+            # Requested Format: rule "cluster <one we are using> -- <model>"
+            print(f"{cluster_name} -- {used_model} | Verdict for {res_props['id']}: Score {res_score}")
+            
+            obs_type = res_props.get("type")
+            
+            if obs_type:
+                self.cache_verdict(res_props, res_score)
+                print(f"[CACHE] Saved {obs_type} -> {res_score}")
+                if self.local_scorer is not None:
+                    self.local_scorer.learn(res_props, res_score)
+                if self.decision_store is not None:
+                    self.decision_store.put(res_props, res_score, used_model,
+                                            self.analyzer.prompt_version, result.get("label"))
+            
+            # TELEMETRY (buffered, written off the game loop)
+            total_game_time = self.sim_time - self.game_start_time
+            steps = self.fleet_total("steps")
+            robot = self.robots[item["robot"]]
+            self.record(
+                "llm_verdict",
+                model=used_model,
+                cluster="B" if was_distant else "A",
+                obstacle=res_props["id"],
+                type=obs_type,
+                robot=item["robot"],
+                score=res_score,
+                duration=result.get("_meta_duration", self.sim_time - item["start_time"]),
+                llm_calls=self.llm_call_count,
+                steps=steps,
+                replans=self.fleet_total("replans"),
+                discovered=self.discovered_obstacles,
+                path_len=len(robot.path),
+                avg_speed=steps / total_game_time if total_game_time > 0 else 0,
+                speed_modifier=robot.speed_modifier,
+            )
+
+            # Update all existing instances of this type on the map
+            type_id = res_props["type_id"]
+            color = self.catalog.color(type_id)
+            for px, py in self.type_cells.get(type_id, ()):
+                p = self.obstacle_props[(px, py)]
+                p["score"] = res_score
+                p.pop("provisional", None)
+                p["color"] = color
+
+                # Resolve the wall status
+                # (If it was waiting as a wall, this will clear it if safe)
+                self.resolve_unknown_obstacle(px, py, res_score)
+
+            self.request_replan("verdict", everyone=True)
+        else:
+            print(f"[LLM] Failed to get valid result for {res_props['id']}. Retrying later if visible.")
+            self.record("llm_verdict", model=None, cluster="B" if was_distant else "A", obstacle=res_props["id"],
+                        type=res_props.get("type"), robot=item["robot"], score=None,
+                        duration=self.sim_time - item["start_time"], llm_calls=self.llm_call_count)
+
+    def log_encounter(self, car_pos, obstacle_pos, props):
+        """Aracın pozisyonunu ve engelin pozisyonunu gösteren fonksiyon."""
+        print(f"[ENCOUNTER] Car Pos: {car_pos} | Obstacle Pos: {obstacle_pos} | Properties: {props}")
+
+    def log_mission_complete(self):
+        """Destination reached logging (telemetry record, profile dump)."""
+        summary = self.mission_summary()
+        if self.telemetry is not None:
+            self.record("mission", **summary)
+            self.telemetry.flush()
+            print("[LOG] Mission completion logged.")
+        if self.profiler.enabled:
+            self.profiler.dump(PROFILE_PATH, mission=summary)
+
+    def record(self, kind, **fields):
+        """Emits a telemetry record stamped with the simulated time (no-op without a sink)."""
+        if self.telemetry is not None:
+            self.telemetry.emit(kind, sim_time=self.sim_time, **fields)
+
+    @profiled("sensors")
+    def check_sensors(self):
+        """
+        Manhattan (elmas) sensör alanı ile engel keşfi.
+        Visible cells come from self.fov; if neither the car nor the real map
+        changed since the last tick there is nothing new to see and the scan is skipped.
+        """
+        if not self.fov.is_stale(self.car_pos):
+            return
+        replan_needed = False
+        visible = self.fov.compute(self.car_pos).tolist()
+        self.profiler.count("los_rays", len(self.fov.offsets))
+        discovered_before = self.discovered_obstacles
+
+        # Elmas alan (|dx| + |dy| <= r) + GÖRÜŞ HATTI KONTROLÜ, tek seferde
+        for x, y in visible:
+            # Gerçekte gizli engel var ama biz bilmiyorsak
+            if self.real_map[x, y] == 2 and (x, y) not in self.obstacle_props: 
+                 # Note: logic changed slightly to allow re-checking if we don't have props yet
+                 # but usually if we have props we've "discovered" it.
+                
+                # Eğer bu engel zaten kayıtlı değilse özellik üret
+                props = self.generate_obstacle_properties()
+                self.obstacle_props[(x, y)] = props
+                self.type_cells.setdefault(props["type_id"], []).append((x, y))
+                self.log_encounter(self.car_pos, (x, y), props)
+                
+                obs_type = props.get("type")
+                type_id = props["type_id"]
+                is_known = type_id not in self.catalog.unknown_id_set
+                score = self.catalog.score(type_id) # Knowledge base or cached verdict, None if unresolved
+                if not is_known and score is None:
+                    self.load_persisted_verdict(props)
+                    score = self.catalog.score(type_id)
+
+                estimate = None
+                if not is_known and score is None:
+                    estimate = self.estimate_locally(props)
+
+                # --- DECISION LOGIC ---
+                
+                # 1. Check Pre-defined Knowledge Base (INSTANT)
+                if is_known:
+                    props["score"] = score
+                    self.cache_verdict(props, score) # Cache it
+                    
+                    # Update map directly
+                    if score > 80: # WALL
+                        self.known_map[x, y] = 1
+                        print(f"[INSTANT] Known Danger: {obs_type} -> WALL")
+                        replan_needed = True
+                    else: # SAFE / CAUTION
+                        # Traversable. map[x][y] stays 0 (or whatever it was).
+                        # Cost will be calculated in A*
+                        pass 
+                        
+                # 2. Check Decision Cache (Previously LLM analyzed)
+                elif score is not None:
+                    self.cache_hit_count += 1 # Increment hit counter
+                    props["score"] = score
+                    
+                    if score > 80:
+                        self.known_map[x, y] = 1
+                        replan_needed = True
+                        
+                # 3. LOCAL FAST PATH: close enough to a scored obstacle, no LLM needed
+                elif estimate is not None and estimate[1] >= LOCAL_ACCEPT_CONFIDENCE:
+                    score, confidence, nearest = estimate
+                    self.local_hit_count += 1
+                    props["score"] = score
+                    self.cache_verdict(props, score)
+                    print(f"[LOCAL] {obs_type} ~ {nearest} (sim {confidence:.2f}) -> {score}")
+
+                    if score > 80:
+                        self.known_map[x, y] = 1
+                        replan_needed = True
+
+                # 4. UNKNOWN -> SAFETY FIRST
+                else:
+                    if estimate is not None and estimate[1] >= LOCAL_PROVISIONAL_CONFIDENCE \
+                            and estimate[0] + LOCAL_SAFETY_MARGIN <= 80:
+                        # Plausibly safe: the planner costs the cell by the estimate while the LLM confirms
+                        self.provisional_count += 1
+                        props["score"] = estimate[0]
+                        props["provisional"] = True
+                        print(f"[LOCAL] {obs_type} ~ {estimate[2]} (sim {estimate[1]:.2f}) -> provisional {estimate[0]}")
+                    else:
+                        # CRITICAL: Mark as WALL temporarily to prevent overlapping
+                        self.known_map[x, y] = 1 
+                    # print(f"[UNKNOWN] Mystery Object: {obs_type} -> Analyizing... (Marked as temp WALL)")
+                    
+                    # Send to LLM (Prevent duplicate requests for same TYPE and same ID)
+                    # Check if we are already evaluating this TYPE or this specific ID
+                    pending = [e[0] for e in self.llm_batches[False]["entries"] + self.llm_batches[True]["entries"]]
+                    pending += [item['props'] for item in self.llm_queue]
+                    is_evaluating_id = any(p['id'] == props['id'] for p in pending)
+                    is_evaluating_type = any(p['type'] == obs_type for p in pending)
+                    
+                    if not is_evaluating_id and not is_evaluating_type:
+                        # --- DISTANCE LOGIC TO SPLIT CLUSTERS ---
+                        # Check distance from obstacle (x, y) to the closest point on the current path
+                        if self.path:
+                            min_dist_to_path = self.path_distance(x, y)
+                        else:
+                            # If no path (e.g. at start), treat as "close" or "far" based on car
+                            min_dist_to_path = abs(self.car_pos[0] - x) + abs(self.car_pos[1] - y)
+
+                        # User Rule: At least 2 blocks away from our road (path) -> Distant Cluster
+                        # (Batched: sent by flush_llm_batches together with other unknowns of the same cluster)
+                        if min_dist_to_path >= 2:
+                            print(f"[CLUSTER B] Routing {obs_type} (Dist: {min_dist_to_path}) to Distant Cluster (Qwen2.5)")
+                            self.queue_for_llm(props, (x, y), distant_mode=True)
+                        else:
+                            print(f"[CLUSTER A] Routing {obs_type} (Dist: {min_dist_to_path}) to Standard Cluster (Load Balanced)")
+                            self.queue_for_llm(props, (x, y), distant_mode=False)
+
+                        replan_needed = True # Because we just put a wall in front of us
+                    else:
+                        self.llm_dedup_count += 1
+                
+                self.mark_cell_changed(x, y)
+                self.discovered_obstacles += 1
+                
+        self.record("scan", robot=self.robot.index, pos=self.car_pos, cells=len(visible),
+                    discovered=self.discovered_obstacles - discovered_before, replan=replan_needed)
+        if replan_needed:
+            # print("[ACTION] Map updated. Recalculating path... (once per tick, see replan_if_needed)")
+            self.request_replan("sensor")
+
+    @profiled("move")
+    def move_car(self, dt):
+        # Hız kontrolü (update_speed)
+        if self.speed_modifier == 0.0:
+            self.move_accumulator = 0.0
+            return # Stop
+            
+        # Accumulate time
+        self.move_accumulator += min(dt, MAX_MOVE_DT)
+        
+        # Calculate delay per step based on blocks per second
+        # If BLOCKS_PER_SECOND = 15, delay = 1/15 = 0.066s
+        current_speed = BLOCKS_PER_SECOND * self.speed_modifier
+        if current_speed <= 0:
+            return
+            
+        step_delay = 1.0 / current_speed
+        # Execute steps
+        while self.move_accumulator >= step_delay:
+            self.move_accumulator -= step_delay
+            if not self.execute_step():
+                break # Blocked: wait for the next tick's replan
+
+    def execute_step(self):
+        """Moves the robot one cell along its path; False if it hit an obstacle or has to give way, and must wait."""
+        if self.path and len(self.path) > 1:
+            next_step = self.path[1]
+            nx, ny = next_step
+
+            # Fleet: never enter a cell another robot stands in; give way for a few steps, then go around it
+            robot = self.robot
+            if any(r is not robot and r.car_pos == next_step for r in self.active_robots()):
+                robot.yields += 1
+                if robot.waited < FLEET_MAX_WAIT:
+                    robot.waited += 1
+                else:
+                    robot.waited = 0
+                    self.plan_detour(next_step)
+                return False
+            robot.waited = 0
+
+            # Güvenlik kontrolü: gerçek dünyada engel varsa "çarptık"
+            if self.real_map[nx, ny] != 0:
+                # Buraya girdiysek, ya unseen wall ya da düşük skorlu bir engeldir.
+                # Düşük skorlu ise, "geçilebilir" (traversable) olduğu için çarpmayız, üstünden geçeriz.
+                # Ancak 'Duvar' (1) veya Score>80 ise çarparız.
+                
+                is_hard_obstacle = (self.real_map[nx, ny] == 1) # Sabit duvar
+                if not is_hard_obstacle and (nx, ny) in self.obstacle_props:
+                    if self.treat_as_wall(self.obstacle_props[(nx, ny)]):
+                        is_hard_obstacle = True
+                
+                if is_hard_obstacle:
+                    # Çarpma!
+                    self.known_map[nx, ny] = 1
+                    self.mark_cell_changed(nx, ny)
+                    self.discovered_obstacles += 1
+                    self.request_replan("collision")
+                    return False
+                else:
+                    # Geçilebilir engel (low score) - İlerle
+                    self.car_pos = next_step
+                    self.path.pop(0)
+                    self.steps += 1
+            else:
+                self.car_pos = next_step
+                self.path.pop(0)
+                self.steps += 1
+            
+            # Check if reached destination
+            if self.car_pos == self.end_pos:
+                print("HEDEF ULAŞILDI! (Goal Reached)")
+                robot.goal_reached = True
+                if all(r.goal_reached for r in self.robots):
+                    self.mission_complete = True
+                    self.log_mission_complete()
+        return True
+
+    def plan_detour(self, cell):
+        """
+        Fleet: replans around the robot standing in cell. The cell costs INF for
+        this replan only (the planner gets its real cost back with the next one);
+        if there is no way around, the old path is kept and the robot waits again.
+        """
+        x, y = cell
+        cost = self.cost_map.item(x, y)
+        old_path = self.path
+        self.cost_map[x, y] = INF
+        self.pending_cell_changes.add(cell)
+        try:
+            self.recalculate_path("detour")
+        finally:
+            self.cost_map[x, y] = cost
+            self.pending_cell_changes.add(cell)
+        if not self.path and not self.planning_in_progress():
+            self.path = old_path
+            self.path_version += 1
+
+    @profiled("tick")
+    def tick(self, dt):
+        """Advances the simulation by dt simulated seconds."""
+        if self.mission_complete:
+            return
+        self.sim_time += dt
+        robots = self.active_robots()
+        for robot in robots:
+            self.robot = robot
+            if self.planner_mode == "anytime":
+                self.planner.begin_frame()
+            self.check_sensors()
+        self.flush_llm_batches()
+        for robot in robots:
+            self.robot = robot
+            self.improve_path()
+
+        if not self.is_warming_up:
+            # Priority Upgrade Check
+            for robot in robots:
+                self.robot = robot
+                self.check_priority_upgrades()
+            self.process_llm_results()
+
+        for robot in robots:
+            self.robot = robot
+            # Sensor / verdict / collision requests and paths blocked by another robot's discoveries
+            self.replan_if_needed()
+            self.update_speed()
+            self.move_car(dt)
+        self.robot = self.robots[0]
+
+    def run_headless(self, max_sim_time=600.0, dt=1.0 / TICK_RATE):
+        """
+        Runs the mission without rendering until the goal is reached, the robot
+        is stuck (no path and nothing pending) or max_sim_time is exceeded.
+        Returns a summary of the mission stats.
+
+        A real backend (analyzer not simulated) answers on the wall clock, so
+        sim_time then follows the wall clock too (ticks every dt seconds). The
+        warmup is not part of max_sim_time or the mission time.
+        """
+        real_clock = not self.simulated_llm
+        last = time.perf_counter()
+        while not self.mission_complete and self.sim_time - self.game_start_time < max_sim_time:
+            if real_clock:
+                time.sleep(dt)
+                now = time.perf_counter()
+                self.tick(now - last)
+                last = now
+            else:
+                self.tick(dt)
+            if self.is_warming_up:
+                self.game_start_time = self.sim_time
+            active = self.active_robots() # Empty once every robot is at its goal
+            batched = self.llm_batches[False]["entries"] or self.llm_batches[True]["entries"]
+            if active and not self.llm_queue and not batched and not self.is_warming_up \
+                    and all(self.robot_stuck(robot) for robot in active):
+                print("[HEADLESS] No path and no pending analysis. Aborting mission.")
+                break
+        self.robot = self.robots[0]
+        if self.profiler.enabled and not self.mission_complete:
+            self.profiler.dump(PROFILE_PATH, mission=self.mission_summary()) # Aborted or out of time
+
+        return self.mission_summary()
+
+    def robot_stuck(self, robot):
+        """True if robot has no path and its planner is not working on one."""
+        self.robot = robot
+        return not self.path and not self.planning_in_progress()
+
+    def fleet_total(self, name):
+        """Sum of a per-robot stat over the fleet."""
+        return sum(getattr(robot, name) for robot in self.robots)
+
+    def mission_summary(self):
+        total_time = self.sim_time - self.game_start_time
+        steps = self.fleet_total("steps")
+        anytime = self.planner_mode == "anytime"
+        return {
+            "reached_goal": self.mission_complete,
+            "total_time": total_time,
+            "steps": steps,
+            "avg_speed": steps / total_time if total_time > 0 else 0,
+            "replans": self.fleet_total("replans"),
+            "replans_by_cause": dict(self.replans_by_cause),
+            "replans_skipped": self.replans_skipped,
+            "llm_calls": self.llm_call_count,
+            "cache_hits": self.cache_hit_count,
+            "local_hits": self.local_hit_count,
+            "provisional": self.provisional_count,
+            "obstacles_found": self.discovered_obstacles,
+            "expansions": self.fleet_total("expansions"),
+            # Anytime planner: mean proven suboptimality of the published paths, s spent searching
+            "plan_bound": sum(r.planner.mean_bound() for r in self.robots) / len(self.robots) if anytime else 1.0,
+            "plan_time": sum(r.planner.time_used for r in self.robots) if anytime else None,
+            # Fleet: unknowns not re-sent to the LLM, steps spent giving way to another robot
+            "fleet_size": len(self.robots),
+            "llm_dedup": self.llm_dedup_count,
+            "yields": self.fleet_total("yields"),
+        }
+
+
+if __name__ == "__main__":
+    # Stand-in backend on the simulated clock; pass analyzer=OllamaAnalyzer() for the real cluster
+    sim = RobotSimulation(analyzer=FakeAnalyzer(), warmup=False, decision_store=DecisionStore(),
+                          telemetry=TelemetrySink())
+    summary = sim.run_headless()
+    for k, v in summary.items():
+        print(f"{k}: {v}")
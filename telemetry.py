@@ -0,0 +1,138 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+TELEMETRY_PATH = "telemetry.jsonl"
+FLUSH_INTERVAL = 1.0          # s between background flushes
+FLUSH_BATCH = 512             # ... or as soon as this many records are waiting
+MAX_BYTES = 10 * 1024 * 1024  # Rotate the file past this size
+BACKUPS = 3                   # telemetry.jsonl.1 ... .3 are kept
+
+
+class TelemetrySink:
+    """
+    Structured, buffered telemetry (JSON Lines).
+
+    emit() only appends a dict to an in-memory buffer, so the game loop never
+    touches the disk; a background thread writes the buffer in batches every
+    flush_interval seconds (sooner once flush_batch records are waiting) and
+    rotates the file past max_bytes (path -> path.1 -> ... -> path.<backups>).
+
+    Every record has "kind" and "ts" (wall clock); the simulation adds
+    "sim_time" and the kind's own fields. Kinds written by the simulation:
+    llm_request, llm_verdict, replan, scan, frame (visualizer), mission.
+    load_telemetry() reads them back.
+    """
+
+    def __init__(self, path=TELEMETRY_PATH, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH,
+                 max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+        self.buffer = deque()
+        self.wakeup = threading.Event()
+        self.closed = False
+
+        # Stats
+        self.emitted = 0
+        self.written = 0
+        self.flushes = 0
+        self.rotations = 0
+        self.errors = 0
+
+        self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def emit(self, kind, **fields):
+        """Queues one record (never blocks on I/O)."""
+        if self.closed:
+            return
+        fields["kind"] = kind
+        fields["ts"] = time.time()
+        self.buffer.append(fields)
+        self.emitted += 1
+        if len(self.buffer) >= self.flush_batch:
+            self.wakeup.set()
+
+    def flush(self):
+        """Asks the writer thread to write what is buffered now (does not wait for it)."""
+        self.wakeup.set()
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.write_pending()
+        self.write_pending()
+
+    def write_pending(self):
+        if not self.buffer:
+            return
+        lines = []
+        while self.buffer:
+            lines.append(json.dumps(self.buffer.popleft(), default=str))
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                size = f.tell()
+            self.written += len(lines)
+            self.flushes += 1
+            if size >= self.max_bytes:
+                self.rotate()
+        except OSError as e:
+            self.errors += 1
+            print(f"[TELEMETRY] Could not write {self.path}: {e}")
+
+    def rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def close(self):
+        """Writes everything still buffered and stops the writer thread."""
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        self.thread.join()
+
+
+def read_records(path=TELEMETRY_PATH, kind=None, backups=BACKUPS):
+    """Records of path and its rotated backups, oldest first (only the given kind if set)."""
+    files = [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]
+    for name in files:
+        if not os.path.exists(name):
+            continue
+        with open(name, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if kind is None or record.get("kind") == kind:
+                    yield record
+
+
+def load_telemetry(path=TELEMETRY_PATH, kind=None):
+    """
+    Telemetry records as a pandas DataFrame (pandas is only needed here).
+    With kind=None every record is loaded and columns not used by a kind are NaN;
+    e.g. load_telemetry(kind="llm_verdict").groupby("model")["duration"].describe().
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(list(read_records(path, kind)))
+    if "ts" in frame:
+        frame["ts"] = pd.to_datetime(frame["ts"], unit="s")
+    return frame
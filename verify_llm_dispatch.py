@@ -0,0 +1,124 @@
+import sys
+import time
+
+from llm_dispatch import LLMDispatcher
+
+
+def sleeper(log, delays, results=None):
+    """request_fn that 'generates' for delays[model] seconds (stops early if cancelled), logging every call."""
+    def request_fn(cancel_event, model_id):
+        entry = {"model": model_id, "cancelled": False, "finished": False}
+        log.append(entry)
+        if cancel_event.wait(delays[model_id]):
+            entry["cancelled"] = True
+            return None
+        entry["finished"] = True
+        return (results or {}).get(model_id, {"score": 10, "by": model_id})
+    return request_fn
+
+
+def poll_until(dispatcher, done, timeout=5.0):
+    """Polls like the game loop until done(delivered) or timeout; returns every (job, result) delivered."""
+    delivered = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        delivered += dispatcher.poll()
+        if done(delivered):
+            break
+        time.sleep(0.01)
+    return delivered
+
+
+def check(ok, message):
+    print(("PASS: " if ok else "FAIL: ") + message)
+    return ok
+
+
+def test_cancellation():
+    dispatcher = LLMDispatcher({"a": 1})
+    log = []
+    running = {"id": "running"}
+    waiting = {"id": "waiting"}
+    dispatcher.submit(running, sleeper(log, {"a": 0.5}), ["a"])
+    dispatcher.submit(waiting, sleeper(log, {"a": 0.5}), ["a"])
+
+    time.sleep(0.05)
+    dispatcher.cancel(waiting) # Still queued: must never start
+    dispatcher.cancel(running) # Generating: gets its cancel_event
+    delivered = poll_until(dispatcher, lambda d: False, timeout=0.3)
+
+    ok = check(len(log) == 1 and log[0]["cancelled"], "Running request stopped by cancel().")
+    ok &= check(not delivered, "No result delivered for cancelled jobs.")
+    ok &= check(dispatcher.in_flight() == 0 and dispatcher.waiting() == 0, "Slot released, queue empty.")
+    dispatcher.shutdown()
+    return ok
+
+
+def test_preemption_requeue():
+    dispatcher = LLMDispatcher({"a": 1, "b": 1})
+    owner = {"id": "owner"}       # Holds b, so the next job spills onto a
+    borrower = {"id": "borrower"} # Runs on borrowed a until an owner of a needs it
+    urgent = {"id": "urgent"}
+    borrower_log = []
+    dispatcher.submit(owner, sleeper([], {"b": 0.4}), ["b"], priority=5)
+    dispatcher.submit(borrower, sleeper(borrower_log, {"a": 1.0, "b": 0.1}), ["b"], priority=10, spill=["a"])
+    time.sleep(0.05)
+    dispatcher.submit(urgent, sleeper([], {"a": 0.1}), ["a"], priority=1)
+
+    delivered = poll_until(dispatcher, lambda d: len(d) == 3)
+    order = [job["id"] for job, _ in delivered]
+
+    ok = check(dispatcher.preempted == 1, "Borrowed slot preempted for the urgent job.")
+    ok &= check(len(borrower_log) == 2 and borrower_log[0]["model"] == "a" and borrower_log[0]["cancelled"],
+                "Preempted run on a was cancelled, then the job ran again.")
+    ok &= check(urgent["model"] == "a" and order.index("urgent") < order.index("borrower"),
+                "Urgent job ran on its own model first.")
+    ok &= check(order.count("borrower") == 1 and borrower["model"] in ("a", "b"),
+                f"Preempted job re-queued and delivered once (on {borrower['model']}).")
+    dispatcher.shutdown()
+    return ok
+
+
+def test_hedge_winner():
+    dispatcher = LLMDispatcher({"a": 1, "b": 1})
+    log = []
+    job = {"id": "hedged"}
+    dispatcher.submit(job, sleeper(log, {"a": 1.0, "b": 0.1}), ["a", "b"], hedge_after=lambda model_id: 0.05)
+
+    delivered = poll_until(dispatcher, lambda d: len(d) == 1)
+    time.sleep(0.1) # Let the loser's thread see its cancel_event
+    loser = [e for e in log if e["model"] == "a"]
+
+    ok = check(len(delivered) == 1 and delivered[0][1]["by"] == "b" and job["model"] == "b",
+               "Hedge on b answered first and won.")
+    ok &= check(dispatcher.hedged == 1 and dispatcher.hedge_wins == 1, "Hedge counted as started and won.")
+    ok &= check(len(loser) == 1 and loser[0]["cancelled"], "Slower first run on a was cancelled.")
+    ok &= check(not poll_until(dispatcher, lambda d: False, timeout=0.2), "Loser delivered nothing.")
+    dispatcher.shutdown()
+    return ok
+
+
+def test_invalid_held_for_hedge():
+    dispatcher = LLMDispatcher({"a": 1, "b": 1})
+    log = []
+    job = {"id": "invalid_first"}
+    # a answers first but with no verdict; the hedge on b is still generating
+    request_fn = sleeper(log, {"a": 0.3, "b": 0.6}, results={"a": None})
+    dispatcher.submit(job, request_fn, ["a", "b"], hedge_after=lambda model_id: 0.05)
+
+    delivered = poll_until(dispatcher, lambda d: len(d) == 1)
+
+    ok = check(dispatcher.hedged == 1, "Hedge started while a was generating.")
+    ok &= check(len(delivered) == 1 and delivered[0][1] is not None and job["model"] == "b",
+                "Invalid result from a held back, valid hedge result from b delivered.")
+    ok &= check(all(e["finished"] for e in log), "Neither run was cancelled.")
+    dispatcher.shutdown()
+    return ok
+
+
+if __name__ == "__main__":
+    results = []
+    for test in (test_cancellation, test_preemption_requeue, test_hedge_winner, test_invalid_held_for_hedge):
+        print(f"Running {test.__name__}...")
+        results.append(test())
+    sys.exit(0 if all(results) else 1)
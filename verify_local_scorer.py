@@ -0,0 +1,53 @@
+import contextlib
+import io
+import sys
+
+from fake_analyzer import FakeAnalyzer, MYSTERY_SCORES
+from local_scorer import LocalScorer, LOCAL_ACCEPT_CONFIDENCE
+from simulation import RobotSimulation
+
+# Local scores may be off by this much from the ground truth and still count as right
+SCORE_TOLERANCE = 15
+
+
+def check(ok, message):
+    print(("PASS: " if ok else "FAIL: ") + message)
+    return ok
+
+
+def test_templates():
+    """Every unknown template the scorer accepts must get about the right score; some must be accepted."""
+    scorer = LocalScorer((t, RobotSimulation.KNOWN_SCORES[t["type"]]) for t in RobotSimulation.OBSTACLE_TEMPLATES
+                         if t["type"] in RobotSimulation.KNOWN_SCORES)
+    accepted = []
+    ok = True
+    for template in RobotSimulation.OBSTACLE_TEMPLATES:
+        if template["type"] in RobotSimulation.KNOWN_SCORES:
+            continue
+        estimate = scorer.estimate(template)
+        if estimate is None or estimate[1] < LOCAL_ACCEPT_CONFIDENCE:
+            continue
+        score, confidence, nearest = estimate
+        truth = MYSTERY_SCORES[template["type"]]
+        accepted.append(template["type"])
+        ok &= check(abs(score - truth) <= SCORE_TOLERANCE,
+                    f"{template['type']} ~ {nearest} (sim {confidence:.2f}) -> {score}, truth {truth}.")
+    ok &= check(bool(accepted), f"Unknown templates scored locally: {', '.join(accepted) or 'none'}.")
+    return ok
+
+
+def test_mission():
+    """A seeded mission resolves some unknowns locally (local_hits > 0)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = RobotSimulation(analyzer=FakeAnalyzer(seed=1), warmup=False, seed=1)
+        summary = sim.run_headless()
+    return check(summary["local_hits"] > 0,
+                 f"Mission made {summary['local_hits']} local hits and {summary['llm_calls']} LLM calls.")
+
+
+if __name__ == "__main__":
+    results = []
+    for test in (test_templates, test_mission):
+        print(f"Running {test.__name__}...")
+        results.append(test())
+    sys.exit(0 if all(results) else 1)